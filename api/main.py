@@ -1,13 +1,42 @@
 from __future__ import annotations
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Query
 from pydantic import BaseModel
-from config import validate_config, CHAT_MODEL
+from config import (
+    validate_config, CHAT_MODEL, DB_PATH, ARCHIVE_DIR, CACHE_MAXSIZE, CACHE_TTL_SECONDS, CACHE_WAIT_TIMEOUT_SECONDS,
+    FAQ_DIR, FAQ_ENABLED, FAQ_MIN_SIMILARITY, FAQ_REBUILD_INTERVAL_SECONDS,
+    KB_DIR, KB_ENABLED, KB_TOP_K,
+)
+from src.cache import AppCache
+from src.storage import DB
 from src.support_agent import run_support, PROMPT_VARIANTS
 from src.i18n import detect_language, translate
-
-app = FastAPI(title="Customer Service Agent API", version="1.0")
+from src.warmup import warm_up
 
 validate_config()
+db = DB(DB_PATH, archive_dir=ARCHIVE_DIR)
+cache = AppCache(maxsize=CACHE_MAXSIZE, ttl_seconds=CACHE_TTL_SECONDS)
+faq_index = None  # set at startup when FAQ_ENABLED
+kb = None  # set at startup when KB_ENABLED
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Heavy imports, graph compilation and DB setup happen here, once per
+    # worker, rather than at import time or on the first request.
+    global faq_index, kb
+    if KB_ENABLED:
+        from src import knowledge
+        kb = knowledge.shared_kb(KB_DIR)
+    if FAQ_ENABLED:
+        from src import faq
+        faq_index = faq.shared_index(FAQ_DIR, min_similarity=FAQ_MIN_SIMILARITY)
+        if FAQ_REBUILD_INTERVAL_SECONDS > 0:
+            app.state.faq_rebuild = faq.start_rebuild_worker(db, FAQ_DIR, FAQ_REBUILD_INTERVAL_SECONDS)
+    app.state.warmup = warm_up(CHAT_MODEL, db, kb=kb, top_k=KB_TOP_K)
+    yield
+
+app = FastAPI(title="Customer Service Agent API", version="1.0", lifespan=lifespan)
 
 class ChatRequest(BaseModel):
     query: str
@@ -21,6 +50,23 @@ class ChatResponse(BaseModel):
     detected_language: str
     latency_ms: int
 
+class SearchHit(BaseModel):
+    id: int
+    created_at: str
+    session_id: str
+    prompt_variant: str
+    category: Optional[str] = None
+    sentiment: Optional[str] = None
+    user_query: str
+    response: Optional[str] = None
+    snippet: str
+    score: float
+
+class SearchResponse(BaseModel):
+    results: list[SearchHit]
+    limit: int
+    offset: int
+
 @app.get("/health")
 def health():
     return {"ok": True}
@@ -32,13 +78,33 @@ def chat(req: ChatRequest):
 
     detected = detect_language(req.query) if req.translate_in_out else "en"
     q = req.query
-    if req.translate_in_out and detected != "en":
-        q = translate(req.query, target_lang="en", model=CHAT_MODEL)
+    try:
+        if req.translate_in_out and detected != "en":
+            q = cache.get_or_set(
+                f"tr::en::{req.query}",
+                lambda: translate(req.query, target_lang="en", model=CHAT_MODEL),
+                timeout=CACHE_WAIT_TIMEOUT_SECONDS,
+            )
 
-    result = run_support(q, prompt_variant=req.prompt_variant, model=CHAT_MODEL)
-    resp = result["response"]
-    if req.translate_in_out and detected != "en":
-        resp = translate(resp, target_lang=detected, model=CHAT_MODEL)
+        # Concurrent identical questions share one run_support call (single-flight);
+        # matching FAQ answers are served before the graph runs (see run_support)
+        result = cache.get_or_set(
+            f"{req.prompt_variant}::{q}",
+            lambda: run_support(
+                q, prompt_variant=req.prompt_variant, model=CHAT_MODEL, kb=kb, top_k=KB_TOP_K, faq=faq_index,
+            ),
+            timeout=CACHE_WAIT_TIMEOUT_SECONDS,
+        )
+        resp = result["response"]
+        if req.translate_in_out and detected != "en":
+            resp = cache.get_or_set(
+                f"tr::{detected}::{resp}",
+                lambda: translate(resp, target_lang=detected, model=CHAT_MODEL),
+                timeout=CACHE_WAIT_TIMEOUT_SECONDS,
+            )
+    except TimeoutError:
+        # Waiting on an identical in-flight request that hasn't finished; free the worker thread
+        raise HTTPException(status_code=504, detail="Timed out waiting for the response; please retry.")
 
     return ChatResponse(
         category=result.get("category",""),
@@ -47,3 +113,30 @@ def chat(req: ChatRequest):
         detected_language=detected,
         latency_ms=result.get("latency_ms",0),
     )
+
+@app.get("/faq/stats")
+def faq_stats():
+    if faq_index is None:
+        return {"enabled": False}
+    return {"enabled": True, **faq_index.stats()}
+
+@app.get("/search", response_model=SearchResponse)
+def search(
+    q: str,
+    prompt_variant: Optional[str] = None,
+    sentiment: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+):
+    hits = db.search(
+        q,
+        prompt_variant=prompt_variant,
+        sentiment=sentiment,
+        since=since,
+        until=until,
+        limit=limit,
+        offset=offset,
+    )
+    return SearchResponse(results=[SearchHit(**h) for h in hits], limit=limit, offset=offset)
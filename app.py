@@ -7,7 +7,10 @@ import streamlit as st
 
 from config import (
     validate_config, OPENAI_API_KEY, CHAT_MODEL, STT_MODEL, TTS_MODEL,
-    DB_PATH, CACHE_MAXSIZE, CACHE_TTL_SECONDS, RATE_LIMIT_RPM
+    DB_PATH, CACHE_MAXSIZE, CACHE_TTL_SECONDS, CACHE_WAIT_TIMEOUT_SECONDS, RATE_LIMIT_RPM,
+    ARCHIVE_DIR, ARCHIVE_AFTER_DAYS, ARCHIVE_INTERVAL_SECONDS,
+    FAQ_DIR, FAQ_ENABLED, FAQ_MIN_SIMILARITY, FAQ_REBUILD_INTERVAL_SECONDS,
+    KB_DIR, KB_ENABLED, KB_TOP_K
 )
 from src.storage import DB
 from src.cache import AppCache
@@ -15,13 +18,59 @@ from src.rate_limit import TokenBucket
 from src.support_agent import run_support, PROMPT_VARIANTS
 from src.i18n import detect_language, translate
 from src.voice import transcribe_wav_bytes, text_to_speech_mp3
+from src.warmup import warm_up
 
 st.set_page_config(page_title="Customer Service Agent", page_icon="💬", layout="wide")
 
 # --- init ---
 validate_config()
-db = DB(DB_PATH)
-cache = AppCache(maxsize=CACHE_MAXSIZE, ttl_seconds=CACHE_TTL_SECONDS)
+db = DB(DB_PATH, archive_dir=ARCHIVE_DIR)
+
+@st.cache_resource
+def get_cache() -> AppCache:
+    # Shared by all sessions so identical concurrent questions coalesce
+    return AppCache(maxsize=CACHE_MAXSIZE, ttl_seconds=CACHE_TTL_SECONDS)
+
+cache = get_cache()
+
+@st.cache_resource
+def start_archiver():
+    # One background archiver per server process, not per Streamlit rerun
+    if ARCHIVE_AFTER_DAYS <= 0:
+        return None
+    db.init()
+    return db.start_archiver(days=ARCHIVE_AFTER_DAYS, interval_seconds=ARCHIVE_INTERVAL_SECONDS)
+
+start_archiver()
+
+def load_kb():
+    # numpy-backed; only imported when the feature is on
+    from src import knowledge
+    return knowledge.shared_kb(KB_DIR)
+
+kb = load_kb() if KB_ENABLED else None
+
+def load_faq_index():
+    from src import faq
+    return faq.shared_index(FAQ_DIR, min_similarity=FAQ_MIN_SIMILARITY)
+
+faq_index = load_faq_index() if FAQ_ENABLED else None
+
+@st.cache_resource
+def warm_up_once():
+    # Compile the graph / load langdetect once per server process
+    return warm_up(CHAT_MODEL, db, kb=kb, top_k=KB_TOP_K)
+
+warm_up_once()
+
+@st.cache_resource
+def start_faq_rebuild():
+    if not FAQ_ENABLED or FAQ_REBUILD_INTERVAL_SECONDS <= 0:
+        return None
+    from src import faq
+    return faq.start_rebuild_worker(db, FAQ_DIR, FAQ_REBUILD_INTERVAL_SECONDS)
+
+start_faq_rebuild()
 
 if "session_id" not in st.session_state:
     st.session_state.session_id = str(uuid.uuid4())
@@ -83,26 +132,46 @@ def handle_user_message(user_query: str, source: str = "text"):
     internal_query = user_query
     final_lang = detected
 
-    if detected != "en":
-        internal_query = translate(user_query, target_lang="en", model=CHAT_MODEL)
-        final_lang = detected
-
     def _compute():
-        return run_support(internal_query, prompt_variant=prompt_variant, model=CHAT_MODEL)
-
-    result = cache.get_or_set(cache_key, _compute)
-
-    # Translate response back if needed
-    response_text = result["response"]
-    if final_lang != "en":
-        response_text = translate(response_text, target_lang=final_lang, model=CHAT_MODEL)
+        # Matching FAQ answers are served before the graph runs (see run_support)
+        return run_support(
+            internal_query, prompt_variant=prompt_variant, model=CHAT_MODEL,
+            kb=kb, top_k=KB_TOP_K, faq=faq_index,
+        )
+
+    try:
+        if detected != "en":
+            internal_query = cache.get_or_set(
+                f"tr::en::{user_query}",
+                lambda: translate(user_query, target_lang="en", model=CHAT_MODEL),
+                timeout=CACHE_WAIT_TIMEOUT_SECONDS,
+            )
+            final_lang = detected
+
+        result = cache.get_or_set(cache_key, _compute, timeout=CACHE_WAIT_TIMEOUT_SECONDS)
+
+        # Translate response back if needed
+        response_text = result["response"]
+        if final_lang != "en":
+            response_text = cache.get_or_set(
+                f"tr::{final_lang}::{response_text}",
+                lambda: translate(response_text, target_lang=final_lang, model=CHAT_MODEL),
+                timeout=CACHE_WAIT_TIMEOUT_SECONDS,
+            )
+    except TimeoutError:
+        st.error("The assistant is taking too long to respond. Please try again in a moment.")
+        return
 
     latency_ms = int((time.time() - t0) * 1000)
 
     audio_mp3_b64 = None
     if enable_tts:
         try:
-            audio_mp3_b64 = text_to_speech_mp3(response_text, model=TTS_MODEL)
+            audio_mp3_b64 = cache.get_or_set(
+                f"tts::{TTS_MODEL}::{response_text}",
+                lambda: text_to_speech_mp3(response_text, api_key=OPENAI_API_KEY, model=TTS_MODEL),
+                timeout=CACHE_WAIT_TIMEOUT_SECONDS,
+            )
         except Exception as e:
             # Don't break the UX if TTS fails
             st.toast(f"TTS error: {e}", icon="⚠️")
@@ -0,0 +1,109 @@
+"""Fail if cold import time of the entrypoints regresses past a budget.
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --scale 1.5   # looser budgets on slow CI
+
+Each module is imported in a fresh interpreter under ``python -X importtime``
+(best of --repeat runs). Also checks that the heavy dependencies stay lazy,
+since one stray top-level import would blow the budget on its own.
+
+``app.py`` is a Streamlit script (importing it would run the app), so for it
+only its top-level import statements are executed, and time / modules that
+``import streamlit`` already brings in are not counted against it.
+"""
+from __future__ import annotations
+import argparse
+import ast
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# target -> budget in ms (cumulative import time, best of N). Roughly 2x what
+# a single-core container with requirements.txt installed measures
+# (voice 50, i18n 60, support_agent 210, api.main 550, app.py 160 on top of streamlit).
+BUDGETS_MS = {
+    "src.voice": 120,
+    "src.i18n": 120,
+    "src.support_agent": 400,
+    "api.main": 1200,
+    "app.py": 350,
+}
+
+# Baseline the target is measured on top of
+BASELINES = {"app.py": "import streamlit"}
+
+# Must not be imported just by importing these modules
+LAZY_MODULES = ("langgraph", "langchain_openai", "langchain_core", "openai", "langdetect", "pandas", "plotly", "numpy")
+
+
+def _env() -> dict[str, str]:
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "sk-import-benchmark")  # api.main validates config on import
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    return env
+
+
+def import_code(target: str) -> str:
+    """Python source that performs the target's imports."""
+    if not target.endswith(".py"):
+        return f"import {target}"
+    with open(os.path.join(ROOT, target), encoding="utf-8") as fh:
+        source = fh.read()
+    tree = ast.parse(source)
+    return "\n".join(
+        ast.get_source_segment(source, node)
+        for node in tree.body
+        if isinstance(node, ast.Import) or isinstance(node, ast.ImportFrom) and node.module != "__future__"
+    )
+
+
+def _run(args: list[str]) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *args], capture_output=True, text=True, env=_env(), check=True, cwd=ROOT)
+
+
+def import_time_ms(code: str) -> float:
+    """Total cumulative import time of running `code` in a fresh process."""
+    proc = _run(["-X", "importtime", "-c", code])
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        # "import time:      self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):  # top-level entries only; nested ones are already counted
+            total_us += int(cumulative)
+    return total_us / 1000
+
+
+def heavy_imports(code: str) -> set[str]:
+    probe = f"{code}\nimport sys\nprint(' '.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    return set(_run(["-c", probe]).stdout.split())
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget")
+    args = parser.parse_args()
+
+    failed = False
+    for target, budget in BUDGETS_MS.items():
+        code = import_code(target)
+        baseline = BASELINES.get(target)
+        best = min(import_time_ms(code) for _ in range(args.repeat))
+        eager = heavy_imports(code)
+        if baseline:
+            best -= min(import_time_ms(baseline) for _ in range(args.repeat))
+            eager -= heavy_imports(baseline)
+        limit = budget * args.scale
+        ok = best <= limit and not eager
+        failed |= not ok
+        note = f"   eagerly imports: {', '.join(sorted(eager))}" if eager else ""
+        print(f"{'ok  ' if ok else 'FAIL'} {target:20} {best:7.1f} ms  (budget {limit:.0f} ms){note}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
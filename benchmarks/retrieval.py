@@ -0,0 +1,68 @@
+"""Benchmark KnowledgeBase.search() on a synthetic knowledge base.
+
+    python -m benchmarks.retrieval --chunks 100000
+
+Ingests Zipf-distributed Markdown documents (one chunk per section) through
+the normal add_document path, then times top-k retrieval.
+"""
+from __future__ import annotations
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from benchmarks.search import VOCAB, CUM_WEIGHTS
+from src.knowledge import KnowledgeBase
+
+QUERIES = [
+    ("how do I get a refund for a late delivery", None),
+    ("password reset email never arrives", "Technical"),
+    ("cancel subscription and get invoice", "Billing"),
+    ("app crash after update", None),
+]
+
+
+def populate(kb: KnowledgeBase, chunks: int, per_doc: int, words: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    categories = ["Technical", "Billing", "General", None]
+    for d in range(0, chunks, per_doc):
+        sections = [
+            f"# Section {d + i}\n" + " ".join(rng.choices(VOCAB, cum_weights=CUM_WEIGHTS, k=words))
+            for i in range(min(per_doc, chunks - d))
+        ]
+        kb.add_document(f"doc-{d // per_doc}.md", "\n\n".join(sections), category=categories[(d // per_doc) % 4])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--per-doc", type=int, default=1000, help="chunks per ingested document")
+    parser.add_argument("--words", type=int, default=80, help="words per chunk")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("-k", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        kb = KnowledgeBase(os.path.join(tmp, "kb"))
+        t0 = time.perf_counter()
+        populate(kb, args.chunks, args.per_doc, args.words)
+        print(f"ingested {len(kb):,} chunks in {time.perf_counter() - t0:.1f}s ({len(kb._segments)} segments)")
+        t0 = time.perf_counter()
+        kb.rebuild()
+        print(f"rebuild (refit IDF, single segment) in {time.perf_counter() - t0:.1f}s")
+
+        for q, category in QUERIES:
+            timings = []
+            for _ in range(args.repeat):
+                t = time.perf_counter()
+                kb.search(q, k=args.k, category=category)
+                timings.append((time.perf_counter() - t) * 1000)
+            timings.sort()
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            print(f"{q!r:46} {str(category):10} median {statistics.median(timings):6.2f} ms   p95 {p95:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
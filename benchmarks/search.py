@@ -0,0 +1,121 @@
+"""Benchmark DB.search() on a synthetic conversations table.
+
+    python -m benchmarks.search --rows 1000000
+
+Builds the table in a temp dir (bulk insert + one FTS rebuild) with
+Zipf-distributed text, then times a few representative queries.
+"""
+from __future__ import annotations
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from src.storage import DB, _fts_query
+
+WORDS = (
+    "refund invoice billing charge card payment order shipping delivery late "
+    "error timeout login password reset account email app crash update sync "
+    "subscription cancel upgrade plan discount coupon tracking address return "
+    "broken missing slow help please thanks again today still cannot"
+).split()
+
+QUERIES = [
+    ("refund", {}),
+    ("error 504", {}),
+    ("password reset", {"prompt_variant": "A"}),
+    ("invoice*", {"sentiment": "Negative"}),
+    ("cancel subscription", {"since": "2024-06-01"}),
+]
+
+
+def _vocabulary(size: int = 20_000) -> tuple[list[str], list[float]]:
+    """Zipf-distributed vocabulary with the support terms spread over ranks ~20-400."""
+    vocab = [f"w{i}" for i in range(size)]
+    for k, w in enumerate(WORDS):
+        vocab.insert(20 + 8 * k, w)
+    cum, total = [], 0.0
+    for rank in range(len(vocab)):
+        total += 1.0 / (rank + 1)
+        cum.append(total)
+    return vocab, cum
+
+
+VOCAB, CUM_WEIGHTS = _vocabulary()
+
+
+def _sentence(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choices(VOCAB, cum_weights=CUM_WEIGHTS, k=n))
+
+
+def populate(db: DB, rows: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    db.init()
+    with db.connect() as conn:
+        # Bulk-load without the per-row trigger, then index once
+        conn.execute("DROP TRIGGER IF EXISTS conversations_fts_ai")
+        batch = []
+        for i in range(rows):
+            query = _sentence(rng, 8)
+            if i % 997 == 0:
+                query += " error 504"
+            batch.append((
+                f"s{i % 5000}",
+                f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}T12:00:00Z",
+                query,
+                "en",
+                rng.choice("AB"),
+                rng.choice(["Technical", "Billing", "General"]),
+                rng.choice(["Positive", "Neutral", "Negative"]),
+                _sentence(rng, 40),
+                rng.randint(200, 3000),
+            ))
+            if len(batch) == 10_000:
+                conn.executemany(
+                    "INSERT INTO conversations (session_id, created_at, user_query, detected_language, "
+                    "prompt_variant, category, sentiment, response, latency_ms) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    batch,
+                )
+                batch.clear()
+        if batch:
+            conn.executemany(
+                "INSERT INTO conversations (session_id, created_at, user_query, detected_language, "
+                "prompt_variant, category, sentiment, response, latency_ms) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                batch,
+            )
+        conn.commit()
+    db.rebuild_search_index()
+    db.init()  # restore the trigger
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DB(os.path.join(tmp, "bench.db"))
+        t0 = time.perf_counter()
+        populate(db, args.rows)
+        print(f"populated {args.rows:,} rows + FTS index in {time.perf_counter() - t0:.1f}s")
+
+        for q, filters in QUERIES:
+            with db.connect() as conn:
+                matches = conn.execute(
+                    "SELECT count(*) FROM conversations_fts WHERE conversations_fts MATCH ?", (_fts_query(q),)
+                ).fetchone()[0]
+            timings = []
+            for _ in range(args.repeat):
+                t = time.perf_counter()
+                db.search(q, limit=20, **filters)
+                timings.append((time.perf_counter() - t) * 1000)
+            timings.sort()
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            print(f"{q!r:24} {str(filters):32} {matches:>9,} matches   median {statistics.median(timings):7.1f} ms   p95 {p95:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
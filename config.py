@@ -15,9 +15,32 @@ TTS_MODEL = os.getenv("TTS_MODEL", "gpt-4o-mini-tts")  # if your account support
 # Storage
 DB_PATH = os.getenv("DB_PATH", "data/app.db")
 
+# Archival: conversations older than this many days move to monthly,
+# compressed partitions in ARCHIVE_DIR (0 disables the background archiver)
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "data/archive")
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+ARCHIVE_INTERVAL_SECONDS = int(os.getenv("ARCHIVE_INTERVAL_SECONDS", "3600"))
+
+# FAQ index: canonical answers mined from history (python -m src.faq build),
+# served before the graph runs (no model call) when similarity >=
+# FAQ_MIN_SIMILARITY and a local check finds no sign of negative sentiment
+FAQ_DIR = os.getenv("FAQ_DIR", "data/faq")
+FAQ_ENABLED = os.getenv("FAQ_ENABLED", "1") == "1"
+FAQ_MIN_SIMILARITY = float(os.getenv("FAQ_MIN_SIMILARITY", "0.9"))
+FAQ_REBUILD_INTERVAL_SECONDS = int(os.getenv("FAQ_REBUILD_INTERVAL_SECONDS", "0"))  # 0 = external scheduler/cron
+
+# Knowledge base (python -m src.knowledge add docs/*.md): top-k passages are
+# retrieved per query and given to the category handler
+KB_DIR = os.getenv("KB_DIR", "data/kb")
+KB_ENABLED = os.getenv("KB_ENABLED", "1") == "1"
+KB_TOP_K = int(os.getenv("KB_TOP_K", "4"))
+
 # Caching
 CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "300"))  # 5 min
 CACHE_MAXSIZE = int(os.getenv("CACHE_MAXSIZE", "2048"))
+# Max wait for an identical in-flight request (translation / answer / TTS)
+# before giving up, so a hung upstream call can't pin every waiter
+CACHE_WAIT_TIMEOUT_SECONDS = float(os.getenv("CACHE_WAIT_TIMEOUT_SECONDS", "60"))
 
 # Rate limiting (per session)
 RATE_LIMIT_RPM = int(os.getenv("RATE_LIMIT_RPM", "20"))  # requests per minute
@@ -1,7 +1,7 @@
 from __future__ import annotations
 import streamlit as st
 import plotly.express as px
-from config import DB_PATH
+from config import DB_PATH, ARCHIVE_DIR
 from src.storage import DB
 from src.analytics import conversations_df
 
@@ -10,7 +10,7 @@ st.set_page_config(page_title="Analytics", page_icon="📊", layout="wide")
 st.title("📊 Analytics Dashboard")
 st.caption("Query patterns, sentiment trends, prompt A/B comparison, and latency.")
 
-db = DB(DB_PATH)
+db = DB(DB_PATH, archive_dir=ARCHIVE_DIR)
 db.init()
 
 rows = db.fetch_conversations(limit=2000)
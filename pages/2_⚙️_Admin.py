@@ -1,20 +1,23 @@
 from __future__ import annotations
 import streamlit as st
 import pandas as pd
-from config import DB_PATH
+from datetime import timedelta
+from config import DB_PATH, ARCHIVE_DIR, FAQ_DIR, FAQ_MIN_SIMILARITY, KB_DIR
 from src.storage import DB
+from src import faq, knowledge
 
 st.set_page_config(page_title="Admin", page_icon="⚙️", layout="wide")
 st.title("⚙️ Admin")
 
-db = DB(DB_PATH)
+db = DB(DB_PATH, archive_dir=ARCHIVE_DIR)
 db.init()
 
 st.subheader("Export database tables")
+include_archive = st.checkbox("Include archived data", value=False, help="Also read rows moved to the monthly archive partitions.")
 
 col1, col2 = st.columns(2)
 with col1:
-    conv = db.fetch_conversations(limit=5000)
+    conv = db.fetch_conversations(limit=5000, include_archive=include_archive)
     conv_df = pd.DataFrame(conv)
     st.download_button(
         "Download conversations.csv",
@@ -25,7 +28,7 @@ with col1:
     )
 
 with col2:
-    fb = db.fetch_feedback_joined(limit=5000)
+    fb = db.fetch_feedback_joined(limit=5000, include_archive=include_archive)
     fb_df = pd.DataFrame(fb)
     st.download_button(
         "Download feedback.csv",
@@ -35,10 +38,102 @@ with col2:
         use_container_width=True,
     )
 
+st.subheader("Search conversations")
+sc = st.columns([3, 1, 1, 1, 1, 1])
+with sc[0]:
+    q = st.text_input("Search", placeholder='e.g. refund, "error 504", invoice*')
+with sc[1]:
+    q_variant = st.selectbox("Variant", ["Any"] + sorted({r["prompt_variant"] for r in conv if r.get("prompt_variant")}))
+with sc[2]:
+    q_sentiment = st.selectbox("Sentiment", ["Any", "Positive", "Neutral", "Negative"])
+with sc[3]:
+    q_since = st.date_input("From", value=None)
+with sc[4]:
+    q_until = st.date_input("To", value=None)
+with sc[5]:
+    q_page = st.number_input("Page", min_value=1, value=1, step=1)
+
+if q:
+    page_size = 25
+    hits = db.search(
+        q,
+        prompt_variant=None if q_variant == "Any" else q_variant,
+        sentiment=None if q_sentiment == "Any" else q_sentiment,
+        since=q_since.isoformat() if q_since else None,
+        # `until` is exclusive; include the whole "To" day
+        until=(q_until + timedelta(days=1)).isoformat() if q_until else None,
+        limit=page_size,
+        offset=(int(q_page) - 1) * page_size,
+    )
+    if not hits:
+        st.info("No matches.")
+    for h in hits:
+        with st.container(border=True):
+            st.caption(f"#{h['id']} · {h['created_at']} · variant {h['prompt_variant']} · {h.get('category') or '-'} / {h.get('sentiment') or '-'}")
+            st.markdown(h["snippet"])
+            with st.expander("Full conversation"):
+                st.markdown(f"**Customer:** {h['user_query']}")
+                st.markdown(f"**Agent:** {h['response']}")
+
+if st.button("Rebuild search index"):
+    db.rebuild_search_index()
+    st.toast("Search index rebuilt.", icon="✅")
+
+st.subheader("FAQ index")
+faq_index = faq.shared_index(FAQ_DIR, min_similarity=FAQ_MIN_SIMILARITY)
+faq_stats = faq_index.stats()
+fq = st.columns(3)
+fq[0].metric("Indexed answers", faq_stats["entries"])
+lookups = sum(v["lookups"] for v in faq_stats["variants"].values())
+hits = sum(v["hits"] for v in faq_stats["variants"].values())
+fq[1].metric("Lookups (this process)", lookups)
+fq[2].metric("Hit rate", f"{(hits / lookups * 100) if lookups else 0:.1f}%")
+if faq_stats["variants"]:
+    st.dataframe(pd.DataFrame(faq_stats["variants"]).T, use_container_width=True)
+if st.button("Rebuild FAQ index"):
+    with st.spinner("Clustering conversation history…"):
+        summary = faq.build_index(db, FAQ_DIR)
+    st.toast(f"Indexed {summary['entries']} answers from {summary['conversations']} conversations.", icon="✅")
+
+st.subheader("Knowledge base")
+st.caption("Markdown and CSV documents the agent retrieves passages from. Re-uploading a file replaces it.")
+kb = knowledge.shared_kb(KB_DIR)
+kc = st.columns([3, 1])
+with kc[0]:
+    uploads = st.file_uploader("Add documents", type=["md", "csv"], accept_multiple_files=True)
+with kc[1]:
+    kb_category = st.selectbox("Category", ["All", "Technical", "Billing", "General"])
+if uploads and st.button("Ingest"):
+    for up in uploads:
+        n = kb.add_document(
+            up.name,
+            up.getvalue().decode("utf-8"),
+            category=None if kb_category == "All" else kb_category,
+            kind="csv" if up.name.lower().endswith(".csv") else "markdown",
+        )
+        st.toast(f"{up.name}: {n} chunks", icon="✅")
+
+docs = kb.documents()
+if not docs:
+    st.info("Knowledge base is empty.")
+else:
+    st.dataframe(pd.DataFrame(docs), use_container_width=True)
+    kd = st.columns([3, 1, 1])
+    with kd[0]:
+        to_delete = st.selectbox("Document", sorted({d["doc_id"] for d in docs}))
+    with kd[1]:
+        if st.button("Delete", use_container_width=True):
+            kb.delete_document(to_delete)
+            st.rerun()
+    with kd[2]:
+        if st.button("Rebuild index", use_container_width=True, help="Refit IDF and drop deleted chunks"):
+            kb.rebuild()
+            st.toast("Knowledge base rebuilt.", icon="✅")
+
 st.subheader("Latest feedback")
 if fb_df.empty:
     st.info("No feedback yet.")
 else:
     st.dataframe(fb_df.head(100), use_container_width=True)
 
-st.caption("Note: For a true learning system, periodically retrain prompts or a retrieval layer using this feedback.")
+st.caption("Note: For a true learning system, periodically retrain prompts using this feedback and keep the knowledge base current.")
@@ -0,0 +1,167 @@
+"""Cold storage for old conversations.
+
+Rows older than the retention window are moved out of the hot DB into one
+SQLite file per month (``conversations_YYYY-MM.db``). The bulky ``response``
+text is zlib-compressed in the archive, and partitions are only ever opened
+read-only for queries.
+"""
+from __future__ import annotations
+import os
+import re
+import sqlite3
+import zlib
+from typing import Iterable
+
+ARCHIVE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+  id INTEGER PRIMARY KEY,
+  session_id TEXT NOT NULL,
+  created_at TEXT NOT NULL,
+  user_query TEXT NOT NULL,
+  detected_language TEXT,
+  prompt_variant TEXT NOT NULL,
+  category TEXT,
+  sentiment TEXT,
+  response BLOB,                       -- zlib-compressed utf-8
+  latency_ms INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS feedback (
+  id INTEGER PRIMARY KEY,
+  conversation_id INTEGER NOT NULL,
+  created_at TEXT NOT NULL,
+  rating INTEGER NOT NULL,
+  comment TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_conversations_created_at ON conversations(created_at);
+"""
+
+_PARTITION_RE = re.compile(r"^conversations_(\d{4}-\d{2})\.db$")
+
+CONVERSATION_COLUMNS = (
+    "id", "session_id", "created_at", "user_query", "detected_language",
+    "prompt_variant", "category", "sentiment", "response", "latency_ms",
+)
+FEEDBACK_COLUMNS = ("id", "conversation_id", "created_at", "rating", "comment")
+
+
+def compress_text(text: str | None) -> bytes | None:
+    if text is None:
+        return None
+    return zlib.compress(text.encode("utf-8"), 9)
+
+
+def decompress_text(blob: bytes | None) -> str | None:
+    if blob is None:
+        return None
+    return zlib.decompress(blob).decode("utf-8")
+
+
+def partition_month(created_at: str) -> str:
+    """'2024-03-05T10:00:00Z' -> '2024-03'."""
+    return created_at[:7]
+
+
+def partition_path(archive_dir: str, month: str) -> str:
+    return os.path.join(archive_dir, f"conversations_{month}.db")
+
+
+def list_partitions(archive_dir: str) -> list[tuple[str, str]]:
+    """Return (month, path) pairs, newest month first."""
+    if not os.path.isdir(archive_dir):
+        return []
+    found = []
+    for name in os.listdir(archive_dir):
+        m = _PARTITION_RE.match(name)
+        if m:
+            found.append((m.group(1), os.path.join(archive_dir, name)))
+    return sorted(found, reverse=True)
+
+
+def _connect_ro(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def write_partition(path: str, conversations: Iterable[dict], feedback: Iterable[dict]) -> None:
+    """Append rows to a month partition. Re-running with the same rows is a no-op."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path)
+    try:
+        conn.executescript(ARCHIVE_SCHEMA)
+        conn.executemany(
+            f"INSERT OR IGNORE INTO conversations ({', '.join(CONVERSATION_COLUMNS)}) "
+            f"VALUES ({', '.join(['?'] * len(CONVERSATION_COLUMNS))})",
+            [
+                [compress_text(r["response"]) if c == "response" else r[c] for c in CONVERSATION_COLUMNS]
+                for r in conversations
+            ],
+        )
+        conn.executemany(
+            f"INSERT OR IGNORE INTO feedback ({', '.join(FEEDBACK_COLUMNS)}) "
+            f"VALUES ({', '.join(['?'] * len(FEEDBACK_COLUMNS))})",
+            [[r[c] for c in FEEDBACK_COLUMNS] for r in feedback],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def find_conversation_months(archive_dir: str, ids: Iterable[int]) -> dict[int, str]:
+    """Month of the partition holding each conversation id; ids not archived are left out."""
+    remaining = set(ids)
+    found: dict[int, str] = {}
+    for month, path in list_partitions(archive_dir):
+        if not remaining:
+            break
+        conn = _connect_ro(path)
+        try:
+            rows = conn.execute(
+                f"SELECT id FROM conversations WHERE id IN ({', '.join(['?'] * len(remaining))})",
+                list(remaining),
+            ).fetchall()
+        finally:
+            conn.close()
+        for r in rows:
+            found[r[0]] = month
+        remaining -= found.keys()
+    return found
+
+
+def _decode_row(row: sqlite3.Row) -> dict:
+    d = dict(row)
+    if "response" in d:
+        d["response"] = decompress_text(d["response"])
+    return d
+
+
+def read_conversations(path: str, limit: int) -> list[dict]:
+    conn = _connect_ro(path)
+    try:
+        rows = conn.execute(
+            "SELECT * FROM conversations ORDER BY datetime(created_at) DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
+        return [_decode_row(r) for r in rows]
+    finally:
+        conn.close()
+
+
+def read_feedback_joined(path: str, limit: int) -> list[dict]:
+    conn = _connect_ro(path)
+    try:
+        rows = conn.execute(
+            """
+            SELECT f.*, c.user_query, c.response, c.prompt_variant
+            FROM feedback f
+            JOIN conversations c ON c.id = f.conversation_id
+            ORDER BY datetime(f.created_at) DESC
+            LIMIT ?
+            """,
+            (limit,),
+        ).fetchall()
+        return [_decode_row(r) for r in rows]
+    finally:
+        conn.close()
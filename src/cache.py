@@ -1,8 +1,21 @@
 # src/cache.py
 from __future__ import annotations
 
+import asyncio
+import threading
 import time
-from typing import Any, Callable
+from typing import Any, Awaitable, Callable
+
+
+class _Flight:
+    """One in-progress computation that concurrent callers can wait on."""
+
+    __slots__ = ("event", "value", "error")
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.value: Any = None
+        self.error: BaseException | None = None
 
 
 class AppCache:
@@ -10,6 +23,9 @@ class AppCache:
     Simple in-memory TTL cache.
     - ttl_seconds: how long a key stays valid
     - maxsize: soft cap (evicts oldest when exceeded)
+
+    get_or_set / aget_or_set are single-flight: concurrent misses on the same
+    key run compute_fn once and every caller gets that result (or exception).
     """
 
     def __init__(self, ttl_seconds: int = 300, maxsize: int = 2048):
@@ -17,6 +33,9 @@ class AppCache:
         self.maxsize = int(maxsize)
         self._store: dict[str, tuple[float, Any]] = {}  # key -> (expires_at, value)
         self._order: list[str] = []  # insertion order for eviction
+        self._lock = threading.RLock()
+        self._inflight: dict[str, _Flight] = {}  # threaded callers
+        self._ainflight: dict[tuple[int, str], asyncio.Task] = {}  # (event loop id, key) -> task
 
     def _purge_expired(self) -> None:
         now = time.time()
@@ -30,6 +49,10 @@ class AppCache:
                 pass
 
     def get(self, key: str) -> Any | None:
+        with self._lock:
+            return self._get(key)
+
+    def _get(self, key: str) -> Any | None:
         self._purge_expired()
         item = self._store.get(key)
         if not item:
@@ -45,6 +68,10 @@ class AppCache:
         return val
 
     def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._set(key, value)
+
+    def _set(self, key: str, value: Any) -> None:
         self._purge_expired()
         expires_at = time.time() + self.ttl_seconds
 
@@ -61,18 +88,68 @@ class AppCache:
         self._store[key] = (expires_at, value)
         self._order.append(key)
 
-    def get_or_set(self, key: str, compute_fn: Callable[[], Any]) -> Any:
+    def get_or_set(self, key: str, compute_fn: Callable[[], Any], timeout: float | None = None) -> Any:
         """
         Return cached value if available; otherwise compute, store, return.
+        If another thread is already computing `key`, wait for its result
+        instead (up to `timeout` seconds, then raise TimeoutError).
+        """
+        with self._lock:
+            cached = self._get(key)
+            if cached is not None:
+                return cached
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+
+        if not leader:
+            if not flight.event.wait(timeout):
+                raise TimeoutError(f"timed out waiting for in-flight computation of {key!r}")
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute_fn()
+            self.set(key, flight.value)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.event.set()
+
+    async def aget_or_set(
+        self, key: str, compute_fn: Callable[[], Awaitable[Any]], timeout: float | None = None
+    ) -> Any:
+        """
+        Async counterpart of get_or_set. The computation runs as a task shared
+        by all awaiters on the same event loop; a caller that times out stops
+        waiting but does not cancel it for the others.
         """
         cached = self.get(key)
         if cached is not None:
             return cached
 
-        value = compute_fn()
-        self.set(key, value)
-        return value
+        flight_key = (id(asyncio.get_running_loop()), key)
+        task = self._ainflight.get(flight_key)
+        if task is None:
+            task = asyncio.ensure_future(self._acompute(flight_key, compute_fn))
+            self._ainflight[flight_key] = task
+        return await asyncio.wait_for(asyncio.shield(task), timeout)
+
+    async def _acompute(self, flight_key: tuple[int, str], compute_fn: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await compute_fn()
+            self.set(flight_key[1], value)
+            return value
+        finally:
+            self._ainflight.pop(flight_key, None)
 
     def clear(self) -> None:
-        self._store.clear()
-        self._order.clear()
+        with self._lock:
+            self._store.clear()
+            self._order.clear()
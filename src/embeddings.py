@@ -0,0 +1,86 @@
+# src/embeddings.py
+from __future__ import annotations
+
+import re
+import zlib
+from typing import Iterable, Sequence
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _stem(word: str) -> str:
+    """Very light plural folding ("refunds" -> "refund", "invoices" -> "invoice")."""
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased, plural-folded word unigrams + bigrams."""
+    words = [_stem(w) for w in _TOKEN_RE.findall(text.lower())]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class HashingEmbedder:
+    """
+    Local, dependency-free text embeddings: TF-IDF over a large hashing space
+    (`n_features`), folded into `dim` buckets with a random sign per feature
+    (the "hashing trick"), so unrelated terms only interfere when they collide.
+    Output rows are L2-normalized, so a dot product is cosine similarity.
+
+    - idf: per-feature IDF weights from fit(); all ones until fitted
+    """
+
+    def __init__(self, dim: int = 256, n_features: int = 2 ** 18, idf: np.ndarray | None = None):
+        self.dim = int(dim)
+        self.n_features = int(n_features)
+        self.idf = idf if idf is not None else np.ones(self.n_features, dtype=np.float32)
+
+    def _features(self, text: str) -> tuple[np.ndarray, np.ndarray]:
+        counts: dict[int, int] = {}
+        for tok in tokenize(text):
+            h = zlib.crc32(tok.encode("utf-8")) % self.n_features
+            counts[h] = counts.get(h, 0) + 1
+        idx = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        tf = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        return idx, tf
+
+    def fit(self, texts: Iterable[str]) -> "HashingEmbedder":
+        """Learn smoothed IDF weights from a corpus."""
+        df = np.zeros(self.n_features, dtype=np.float64)
+        n = 0
+        for text in texts:
+            idx, _ = self._features(text)
+            df[idx] += 1
+            n += 1
+        self.idf = (np.log((1 + n) / (1 + df)) + 1).astype(np.float32)
+        return self
+
+    def sparse(self, text: str) -> tuple[np.ndarray, np.ndarray]:
+        """L2-normalized TF-IDF weights over the hashing space, as (feature ids, weights)."""
+        idx, tf = self._features(text)
+        w = (1 + np.log(tf)) * self.idf[idx]
+        norm = float(np.linalg.norm(w))
+        return idx, (w / norm if norm else w)
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            idx, w = self.sparse(text)
+            if len(idx) == 0:
+                continue
+            w = w.copy()
+            w[(idx // self.dim) & 1 == 1] *= -1
+            np.add.at(out[i], idx % self.dim, w)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return out / norms
+
+    def embed_one(self, text: str) -> np.ndarray:
+        return self.embed([text])[0]
+
+    def params(self) -> dict:
+        """Constructor args (minus idf) for persisting alongside an index."""
+        return {"dim": self.dim, "n_features": self.n_features}
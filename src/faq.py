@@ -0,0 +1,336 @@
+"""Precomputed FAQ answers mined from conversation history.
+
+Offline (``python -m src.faq build``): cluster past English queries per
+(category, prompt variant), keep the biggest clusters, and for each pick the
+best-rated response as the canonical answer. The index is a float32 matrix of
+cluster centroids (``vectors.npy``, memory-mapped at load) plus JSON metadata.
+Every build goes to its own ``build-*`` directory and is published by
+atomically replacing the ``CURRENT`` pointer file, so readers never mix files
+from two builds and concurrent builds never share a scratch directory.
+
+Online: ``FaqIndex.lookup`` embeds the query and returns the canonical answer
+when cosine similarity to a centroid clears the threshold.
+"""
+from __future__ import annotations
+import argparse
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Optional
+
+import numpy as np
+
+from src.embeddings import HashingEmbedder
+from src.storage import DB
+from src.worker import PeriodicWorker
+
+logger = logging.getLogger(__name__)
+
+# Bump when the on-disk layout or HashingEmbedder's features change; readers
+# ignore builds written with another version until the index is rebuilt.
+FORMAT_VERSION = 2
+
+VECTORS_FILE = "vectors.npy"
+IDF_FILE = "idf.npy"
+META_FILE = "meta.json"
+CURRENT_FILE = "CURRENT"  # name of the published build directory
+BUILD_PREFIX = "build-"
+PRUNE_AFTER_SECONDS = 600  # unpublished/superseded builds older than this are removed
+
+
+@dataclass
+class FaqHit:
+    question: str
+    response: str
+    category: str
+    prompt_variant: str
+    similarity: float
+
+
+def _history(db: DB) -> list[dict]:
+    """Answered English conversations with their summed feedback rating."""
+    with db.connect() as conn:
+        rows = conn.execute(
+            """
+            SELECT c.id, c.created_at, c.user_query, c.response, c.category, c.prompt_variant,
+                   COALESCE(SUM(f.rating), 0) AS rating
+            FROM conversations c
+            LEFT JOIN feedback f ON f.conversation_id = c.id
+            WHERE c.response IS NOT NULL
+              AND COALESCE(c.detected_language, 'en') = 'en'
+              AND COALESCE(c.sentiment, '') != 'Negative'   -- those got the escalation template
+            GROUP BY c.id
+            """
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+
+def _cluster(vectors: np.ndarray, threshold: float) -> list[list[int]]:
+    """Greedy leader clustering: join the most similar cluster if >= threshold."""
+    centroids = np.zeros((len(vectors), vectors.shape[1] if vectors.ndim == 2 else 0), dtype=np.float32)
+    sums = np.zeros_like(centroids)
+    members: list[list[int]] = []
+    for i, v in enumerate(vectors):
+        k = len(members)
+        if k:
+            sims = centroids[:k] @ v
+            best = int(np.argmax(sims))
+            if sims[best] >= threshold:
+                members[best].append(i)
+                sums[best] += v
+                centroids[best] = sums[best] / (np.linalg.norm(sums[best]) or 1.0)
+                continue
+        members.append([i])
+        sums[k] = centroids[k] = v
+    return members
+
+
+def build_index(
+    db: DB,
+    out_dir: str,
+    top_n: int = 50,
+    min_cluster_size: int = 3,
+    min_rating: int = 1,
+    cluster_threshold: float = 0.8,
+) -> dict:
+    """
+    Mine the conversation history and write a fresh index to `out_dir`.
+    Only clusters with at least one response rated >= `min_rating` are kept.
+    Returns a small summary dict.
+    """
+    rows = _history(db)
+    embedder = HashingEmbedder().fit(r["user_query"] for r in rows)
+
+    groups: Dict[tuple, list[dict]] = {}
+    for r in rows:
+        groups.setdefault((r["category"] or "General", r["prompt_variant"]), []).append(r)
+
+    entries: list[dict] = []
+    vectors: list[np.ndarray] = []
+    for (category, variant), group in sorted(groups.items()):
+        vecs = embedder.embed([r["user_query"] for r in group])
+        clusters = [c for c in _cluster(vecs, cluster_threshold) if len(c) >= min_cluster_size]
+        clusters.sort(key=len, reverse=True)
+        kept = 0
+        for members in clusters:
+            if kept >= top_n:
+                break
+            best = max(members, key=lambda i: (group[i]["rating"], group[i]["created_at"]))
+            if group[best]["rating"] < min_rating:
+                continue
+            centroid = vecs[members].mean(axis=0)
+            vectors.append(centroid / (np.linalg.norm(centroid) or 1.0))
+            entries.append({
+                "question": group[best]["user_query"],
+                "response": group[best]["response"],
+                "category": category,
+                "prompt_variant": variant,
+                "cluster_size": len(members),
+                "rating": group[best]["rating"],
+            })
+            kept += 1
+
+    matrix = np.stack(vectors).astype(np.float32) if vectors else np.zeros((0, embedder.dim), dtype=np.float32)
+    meta = {"format": FORMAT_VERSION, "built_at": time.time(), "embedder": embedder.params(), "entries": entries}
+
+    os.makedirs(out_dir, exist_ok=True)
+    build_dir = tempfile.mkdtemp(prefix=f"{BUILD_PREFIX}{time.time_ns()}-", dir=out_dir)
+    np.save(os.path.join(build_dir, VECTORS_FILE), matrix)
+    np.save(os.path.join(build_dir, IDF_FILE), embedder.idf)
+    with open(os.path.join(build_dir, META_FILE), "w", encoding="utf-8") as fh:
+        json.dump(meta, fh)
+    _publish(out_dir, os.path.basename(build_dir))
+    _prune_builds(out_dir)
+
+    return {"conversations": len(rows), "entries": len(entries)}
+
+
+def _publish(out_dir: str, build_name: str) -> None:
+    """Point CURRENT at `build_name` with a single atomic rename."""
+    fd, tmp = tempfile.mkstemp(prefix=f".{CURRENT_FILE}-", dir=out_dir)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            fh.write(build_name)
+        os.replace(tmp, os.path.join(out_dir, CURRENT_FILE))
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def current_build(out_dir: str) -> Optional[str]:
+    """Name of the published build directory, or None if nothing is published."""
+    try:
+        with open(os.path.join(out_dir, CURRENT_FILE), encoding="utf-8") as fh:
+            return fh.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _prune_builds(out_dir: str) -> None:
+    """
+    Remove superseded builds. Ones younger than PRUNE_AFTER_SECONDS are kept:
+    they may still be written by a concurrent build or being loaded by a reader
+    (already memory-mapped files stay readable after removal).
+    """
+    keep = current_build(out_dir)
+    cutoff = time.time() - PRUNE_AFTER_SECONDS
+    for name in os.listdir(out_dir):
+        path = os.path.join(out_dir, name)
+        if not name.startswith(BUILD_PREFIX) or name == keep:
+            continue
+        try:
+            if os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+        except FileNotFoundError:
+            pass  # pruned by a concurrent build
+
+
+class FaqIndex:
+    """
+    Read side of the FAQ index. Reloads itself when a rebuild lands on disk
+    (checked at most every `reload_check_seconds`) and counts hits/lookups.
+    A build from another FORMAT_VERSION, or one that fails to load, is logged
+    and skipped: the index keeps what it had (nothing, at startup) until a
+    good build is published.
+    """
+
+    def __init__(self, path: str, min_similarity: float = 0.9, reload_check_seconds: float = 30.0):
+        self.path = path
+        self.min_similarity = float(min_similarity)
+        self.reload_check_seconds = float(reload_check_seconds)
+        self._lock = threading.Lock()
+        self._loaded_build: str | None = None
+        self._skipped_build: str | None = None
+        self._checked_at = 0.0
+        self._vectors = np.zeros((0, 1), dtype=np.float32)
+        self._entries: list[dict] = []
+        self._embedder: HashingEmbedder | None = None
+        self._variant_rows: Dict[str, np.ndarray] = {}
+        self.lookups: Dict[str, int] = {}
+        self.hits: Dict[str, int] = {}
+        self._maybe_reload(force=True)
+
+    def _maybe_reload(self, force: bool = False) -> None:
+        now = time.time()
+        if not force and now - self._checked_at < self.reload_check_seconds:
+            return
+        self._checked_at = now
+        build = current_build(self.path)
+        if build is None and os.path.isfile(os.path.join(self.path, META_FILE)):
+            build = "."  # pre-CURRENT layout: files directly in the index dir (skipped as format 1)
+        if build is None or build in (self._loaded_build, self._skipped_build):
+            return
+        try:
+            loaded = self._load(os.path.join(self.path, build))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning("FAQ index %s could not be loaded (%s); rebuild it with `python -m src.faq build`", build, e)
+            loaded = None
+        if loaded is None:
+            self._skipped_build = build
+            return
+        self._vectors, self._entries, self._embedder = loaded
+        self._variant_rows = {
+            v: np.array([i for i, e in enumerate(self._entries) if e["prompt_variant"] == v], dtype=np.int64)
+            for v in {e["prompt_variant"] for e in self._entries}
+        }
+        self._loaded_build = build
+
+    @staticmethod
+    def _load(build_dir: str) -> Optional[tuple[np.ndarray, list[dict], HashingEmbedder]]:
+        """Vectors, entries and embedder of one build; None if it has another format version."""
+        with open(os.path.join(build_dir, META_FILE), encoding="utf-8") as fh:
+            meta = json.load(fh)
+        if meta.get("format") != FORMAT_VERSION:
+            logger.warning(
+                "FAQ index %s has format %s, expected %s; ignoring it until rebuilt",
+                build_dir, meta.get("format"), FORMAT_VERSION,
+            )
+            return None
+        entries = meta["entries"]
+        embedder = HashingEmbedder(idf=np.load(os.path.join(build_dir, IDF_FILE)), **meta["embedder"])
+        vectors = np.load(os.path.join(build_dir, VECTORS_FILE), mmap_mode="r")
+        if vectors.shape != (len(entries), embedder.dim) or embedder.idf.shape != (embedder.n_features,):
+            raise ValueError(f"vectors {vectors.shape} / idf {embedder.idf.shape} do not match meta.json")
+        return vectors, entries, embedder
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, query: str, prompt_variant: str) -> Optional[FaqHit]:
+        with self._lock:
+            self._maybe_reload()
+            self.lookups[prompt_variant] = self.lookups.get(prompt_variant, 0) + 1
+            rows = self._variant_rows.get(prompt_variant)
+            if rows is None or len(rows) == 0:
+                return None
+            sims = self._vectors[rows] @ self._embedder.embed_one(query)
+            best = int(np.argmax(sims))
+            if sims[best] < self.min_similarity:
+                return None
+            self.hits[prompt_variant] = self.hits.get(prompt_variant, 0) + 1
+            e = self._entries[int(rows[best])]
+        return FaqHit(
+            question=e["question"],
+            response=e["response"],
+            category=e["category"],
+            prompt_variant=e["prompt_variant"],
+            similarity=float(sims[best]),
+        )
+
+    def stats(self) -> dict:
+        """Per-variant lookups, hits and hit rate since this process started."""
+        out = {}
+        for v, n in sorted(self.lookups.items()):
+            h = self.hits.get(v, 0)
+            out[v] = {"lookups": n, "hits": h, "hit_rate": round(h / n, 4) if n else 0.0}
+        return {"entries": len(self._entries), "variants": out}
+
+
+@lru_cache(maxsize=None)
+def shared_index(path: str, min_similarity: float = 0.9) -> FaqIndex:
+    """Process-wide index instance, so the app, pages and API share hit counters."""
+    return FaqIndex(path, min_similarity=min_similarity)
+
+
+def start_rebuild_worker(db: DB, out_dir: str, interval_seconds: float, **build_kwargs) -> PeriodicWorker:
+    """Rebuild the index every `interval_seconds` in a daemon thread."""
+    def step() -> None:
+        build_index(db, out_dir, **build_kwargs)
+
+    worker = PeriodicWorker(
+        "faq-rebuild",
+        step,
+        interval_seconds=interval_seconds,
+        wait_first=True,
+    )
+    worker.start()
+    return worker
+
+
+def main() -> None:
+    from config import DB_PATH, FAQ_DIR
+
+    parser = argparse.ArgumentParser(description="Build the precomputed FAQ answer index.")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--out", default=FAQ_DIR)
+    parser.add_argument("--top-n", type=int, default=50, help="max intents per category/variant")
+    parser.add_argument("--min-cluster-size", type=int, default=3)
+    parser.add_argument("--min-rating", type=int, default=1)
+    args = parser.parse_args()
+
+    summary = build_index(
+        DB(args.db), args.out,
+        top_n=args.top_n, min_cluster_size=args.min_cluster_size, min_rating=args.min_rating,
+    )
+    print(f"indexed {summary['entries']} FAQ answers from {summary['conversations']} conversations -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,33 @@
 # src/i18n.py
+from __future__ import annotations
 
-from langdetect import detect
-from openai import OpenAI
+from functools import lru_cache
 from config import OPENAI_MODEL
 
-client = OpenAI()
+# langdetect and openai are imported on first use: both are slow to import
+# and langdetect loads its language profiles lazily anyway (see warm_up()).
+
+
+@lru_cache(maxsize=1)
+def _client():
+    from openai import OpenAI
+    return OpenAI()
+
+
+def warm_up() -> None:
+    """Load langdetect's language profiles now instead of on the first request."""
+    detect_language("warm up")
 
 
 def detect_language(text: str) -> str:
+    from langdetect import detect
     try:
         return detect(text)
     except Exception:
         return "en"
 
 
-def translate(text: str, target_lang: str) -> str:
+def translate(text: str, target_lang: str, model: str = OPENAI_MODEL) -> str:
     """
     Translates text to target_lang using OpenAI.
     If target_lang == 'en', returns text unchanged.
@@ -28,8 +41,8 @@ def translate(text: str, target_lang: str) -> str:
         f"Text: {text}"
     )
 
-    response = client.chat.completions.create(
-        model=OPENAI_MODEL,
+    response = _client().chat.completions.create(
+        model=model,
         messages=[{"role": "user", "content": prompt}],
         temperature=0
     )
@@ -0,0 +1,499 @@
+"""Local knowledge base for grounded responses.
+
+Markdown / CSV documents are split into chunks, weighted with hashed TF-IDF
+(``src.embeddings.HashingEmbedder.sparse``) and stored as:
+
+- ``seg-NNNNNN.{features,rows,weights}.npy``: immutable segments of postings
+  sorted by feature id, memory-mapped for search. Every ingest appends one;
+  they are merged when there are too many.
+- ``chunks.db``: SQLite with chunk text, source document, category, a
+  ``deleted`` flag (deletes are tombstones until ``rebuild()``), the current
+  segment and IDF file names and a write generation
+- ``idf-NNNNNN.npy``: IDF weights, fitted on the first ingest or by
+  ``rebuild()``; like segments, a new file per fit, never rewritten in place
+
+Files a write replaces are kept for PRUNE_AFTER_SECONDS, so other processes
+still loading the previous generation can finish; later writes remove them.
+
+Scores are exact cosine similarities, so there is no approximation noise
+from a low-dimensional projection.
+
+    python -m src.knowledge add docs/*.md faq.csv --category Billing
+    python -m src.knowledge delete docs/refunds.md
+    python -m src.knowledge search "refund takes how long"
+"""
+from __future__ import annotations
+import argparse
+import csv
+import io
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+
+from src.embeddings import HashingEmbedder
+
+CHUNKS_DB = "chunks.db"
+LEGACY_IDF_FILE = "idf.npy"  # before IDF files were versioned like segments
+SEGMENT_PARTS = ("features", "rows", "weights")
+PRUNE_AFTER_SECONDS = 600  # replaced segment/IDF files older than this are removed
+
+SCHEMA = """
+PRAGMA journal_mode=WAL;
+
+CREATE TABLE IF NOT EXISTS chunks (
+  row INTEGER PRIMARY KEY,           -- row id used in segment postings
+  doc_id TEXT NOT NULL,
+  category TEXT,                     -- NULL = applies to every category
+  text TEXT NOT NULL,
+  deleted INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_chunks_doc ON chunks(doc_id);
+
+CREATE TABLE IF NOT EXISTS meta (
+  key TEXT PRIMARY KEY,
+  value TEXT NOT NULL
+);
+"""
+
+_HEADING_RE = re.compile(r"^#{1,6}\s", re.MULTILINE)
+
+
+@dataclass
+class Passage:
+    doc_id: str
+    text: str
+    score: float
+    category: Optional[str] = None
+
+
+def chunk_markdown(text: str, max_words: int = 160, overlap: int = 30) -> list[str]:
+    """Split on headings, then window long sections (each window keeps its heading)."""
+    starts = [m.start() for m in _HEADING_RE.finditer(text)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    sections = [text[a:b].strip() for a, b in zip(starts, starts[1:] + [len(text)])]
+
+    chunks = []
+    for section in filter(None, sections):
+        first, _, rest = section.partition("\n")
+        heading = first if first.startswith("#") else ""
+        words = (rest if heading else section).split()
+        step = max_words - overlap
+        for i in range(0, max(len(words), 1), step):
+            body = " ".join(words[i:i + max_words])
+            if body or heading:
+                chunks.append(f"{heading}\n{body}".strip())
+            if i + max_words >= len(words):
+                break
+    return chunks
+
+
+def chunk_csv(text: str) -> list[tuple[str, Optional[str]]]:
+    """One chunk per row as 'column: value' lines; a `category` column tags the row."""
+    out = []
+    for row in csv.DictReader(io.StringIO(text)):
+        category = (row.pop("category", None) or "").strip() or None
+        body = "\n".join(f"{k}: {v}" for k, v in row.items() if k and v)
+        if body:
+            out.append((body, category))
+    return out
+
+
+class KnowledgeBase:
+    """
+    Sparse TF-IDF index over knowledge-base chunks, scored by exact cosine
+    similarity. Each ingest writes a small immutable segment (postings sorted
+    by feature id, memory-mapped for search); segments are merged once there
+    are more than `max_segments`.
+
+    Safe to share between threads and between processes using the same
+    `path`: every write runs in one SQLite write transaction and bumps the
+    ``generation`` in ``meta``; searches and writes reload first when it has
+    moved since this instance last loaded. Replaced files outlive the write
+    by PRUNE_AFTER_SECONDS, so a reader never loses files mid-load.
+    """
+
+    def __init__(self, path: str, max_segments: int = 8):
+        self.path = path
+        self.max_segments = int(max_segments)
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(os.path.join(path, CHUNKS_DB), check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        self._generation = None
+        with self._lock:
+            self._sync()
+
+    # --- internal state ---
+
+    def _meta(self, key: str, default=None):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _set_meta(self, key: str, value) -> None:
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _load(self) -> None:
+        """
+        Read everything from disk; call inside _snapshot() or _write() so it is
+        consistent. State is only replaced once every file has loaded, so a
+        failed load leaves the previous generation in place.
+        """
+        generation = self._meta("generation", 0)
+        idf_name = self._meta("idf", LEGACY_IDF_FILE if os.path.exists(self._file(LEGACY_IDF_FILE)) else None)
+        idf = np.load(self._file(idf_name)) if idf_name else None
+        segment_names = self._meta("segments", [])
+        segments = [
+            tuple(np.load(self._file(f"{name}.{part}.npy"), mmap_mode="r") for part in SEGMENT_PARTS)
+            for name in segment_names
+        ]
+
+        rows = self._conn.execute("SELECT row, category, deleted FROM chunks ORDER BY row").fetchall()
+        n = rows[-1][0] + 1 if rows else 0
+        categories = sorted({c for _, c, _ in rows if c})
+        codes = {c: i + 1 for i, c in enumerate(categories)}  # 0 = untagged
+        category_codes = np.zeros(n, dtype=np.int32)
+        alive = np.zeros(n, dtype=bool)
+        for r, c, d in rows:
+            category_codes[r] = codes.get(c, 0)
+            alive[r] = not d
+
+        self.embedder = HashingEmbedder(idf=idf, **self._meta("embedder", {}))
+        self.fitted = idf is not None
+        self._categories, self._category_codes, self._alive = categories, category_codes, alive
+        self._segment_names, self._segments = segment_names, segments
+        self._generation = generation
+
+    def _refresh(self) -> None:
+        """Reload if another instance or process has committed a write since our last load."""
+        if self._meta("generation", 0) != self._generation:
+            self._load()
+
+    def _sync(self, force: bool = False) -> None:
+        """
+        _refresh() (or, with `force`, _load()) in a read snapshot. A file can
+        only be missing if the snapshot is older than PRUNE_AFTER_SECONDS worth
+        of writes; retry in a fresh one, unless nothing has been committed since.
+        """
+        while True:
+            with self._snapshot():
+                try:
+                    if force:
+                        self._load()
+                    else:
+                        self._refresh()
+                    return
+                except FileNotFoundError:
+                    failed = self._meta("generation", 0)
+            if self._meta("generation", 0) == failed:
+                raise
+
+    @contextmanager
+    def _snapshot(self):
+        """Read transaction: every statement inside sees the same committed state."""
+        self._conn.execute("BEGIN")
+        try:
+            yield
+        finally:
+            self._conn.commit()
+
+    @contextmanager
+    def _write(self):
+        """
+        Write transaction (BEGIN IMMEDIATE, so one writer at a time across
+        processes) on up-to-date state. Commits with a bumped generation,
+        stamping the files the write replaced so _prune() keeps them for a
+        grace period; on error rolls back and deletes the files it created.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._created: list[str] = []
+            self._replaced: list[str] = []
+            try:
+                self._refresh()
+                yield
+                self._retire(self._replaced)
+                self._prune()
+                self._set_meta("generation", self._generation + 1)
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                self._remove(self._created)
+                self._sync(force=True)  # in-memory state may be half-updated
+                raise
+            self._sync()
+
+    @staticmethod
+    def _remove(paths: list[str]) -> None:
+        for path in paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass  # already gone; open mmaps keep the data alive on POSIX
+
+    @staticmethod
+    def _retire(paths: list[str]) -> None:
+        """Stamp replaced files with the time they stopped being current (their mtime)."""
+        for path in paths:
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                pass
+
+    def _prune(self) -> None:
+        """
+        Remove segment/IDF files the state being written no longer references
+        and that were replaced (or, left by a crashed writer, created) more than
+        PRUNE_AFTER_SECONDS ago. Call inside _write(): writers are serialized,
+        so nothing unreferenced is still being written.
+        """
+        keep = {self._meta("idf", LEGACY_IDF_FILE)}
+        keep.update(f"{name}.{part}.npy" for name in self._meta("segments", []) for part in SEGMENT_PARTS)
+        cutoff = time.time() - PRUNE_AFTER_SECONDS
+        for name in os.listdir(self.path):
+            if name in keep or not (name.startswith(("seg-", "idf-")) or name == LEGACY_IDF_FILE):
+                continue
+            try:
+                if os.path.getmtime(self._file(name)) < cutoff:
+                    os.remove(self._file(name))
+            except OSError:
+                pass  # already gone, or still mapped on a platform that forbids it; next write retries
+
+    def __len__(self) -> int:
+        return int(self._alive.sum())
+
+    # --- writes (call inside _write()) ---
+
+    def _next_name(self, prefix: str) -> str:
+        n = self._meta("next_segment", 0)  # one counter for segment and IDF files
+        self._set_meta("next_segment", n + 1)
+        return f"{prefix}-{n:06d}"
+
+    def _save_idf(self) -> None:
+        name = f"{self._next_name('idf')}.npy"
+        np.save(self._file(name), self.embedder.idf)
+        self._created.append(self._file(name))
+        old = self._meta("idf", LEGACY_IDF_FILE if self.fitted else None)
+        if old:
+            self._replaced.append(self._file(old))
+        self._set_meta("idf", name)
+        self._set_meta("embedder", {"n_features": self.embedder.n_features})
+
+    def _write_segment(self, features: np.ndarray, rows: np.ndarray, weights: np.ndarray) -> str:
+        order = np.argsort(features, kind="stable")
+        name = self._next_name("seg")
+        for part, arr in zip(SEGMENT_PARTS, (features[order], rows[order], weights[order])):
+            np.save(self._file(f"{name}.{part}.npy"), arr)
+            self._created.append(self._file(f"{name}.{part}.npy"))
+        return name
+
+    def _postings(self, chunks: list[tuple[int, str]]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        feats, rows, weights = [], [], []
+        for row, text in chunks:
+            idx, w = self.embedder.sparse(text)
+            feats.append(idx.astype(np.int32))
+            rows.append(np.full(len(idx), row, dtype=np.int32))
+            weights.append(w.astype(np.float32))
+        if not feats:
+            return np.zeros(0, np.int32), np.zeros(0, np.int32), np.zeros(0, np.float32)
+        return np.concatenate(feats), np.concatenate(rows), np.concatenate(weights)
+
+    def _replace_segments(self, names: list[str]) -> None:
+        for name in set(self._segment_names) - set(names):
+            self._replaced.extend(self._file(f"{name}.{part}.npy") for part in SEGMENT_PARTS)
+        self._set_meta("segments", names)
+
+    def _merge_segments(self) -> None:
+        """Fold every segment into one, dropping postings of deleted chunks."""
+        if not self._segments:
+            return
+        feats, rows, weights = (np.concatenate([seg[i] for seg in self._segments]) for i in range(3))
+        keep = self._alive[rows]
+        name = self._write_segment(feats[keep], rows[keep], weights[keep])
+        self._replace_segments([name])
+
+    def add_document(self, doc_id: str, text: str, category: Optional[str] = None, kind: str = "markdown") -> int:
+        """Chunk, index and append a document (replacing any previous version). Returns chunk count."""
+        if kind == "csv":
+            chunks = [(t, c or category) for t, c in chunk_csv(text)]
+        else:
+            chunks = [(t, category) for t in chunk_markdown(text)]
+
+        with self._write():
+            self._delete(doc_id)
+            if chunks:
+                if not self.fitted:
+                    # First ingest: fit IDF on what we have; rebuild() refits later
+                    self.embedder.fit(t for t, _ in chunks)
+                    self._save_idf()
+                # Allocated from the table, not our in-memory state, so two
+                # processes can never hand out the same rows
+                start = self._conn.execute("SELECT COALESCE(MAX(row), -1) + 1 FROM chunks").fetchone()[0]
+                self._conn.executemany(
+                    "INSERT INTO chunks (row, doc_id, category, text) VALUES (?, ?, ?, ?)",
+                    [(start + i, doc_id, c, t) for i, (t, c) in enumerate(chunks)],
+                )
+                name = self._write_segment(*self._postings([(start + i, t) for i, (t, _) in enumerate(chunks)]))
+                self._replace_segments(self._segment_names + [name])
+        if len(self._segments) > self.max_segments:
+            with self._write():
+                if len(self._segments) > self.max_segments:
+                    self._merge_segments()
+        return len(chunks)
+
+    def add_file(self, file_path: str, category: Optional[str] = None, doc_id: Optional[str] = None) -> int:
+        with open(file_path, encoding="utf-8") as fh:
+            text = fh.read()
+        kind = "csv" if file_path.lower().endswith(".csv") else "markdown"
+        return self.add_document(doc_id or file_path, text, category=category, kind=kind)
+
+    def _delete(self, doc_id: str) -> int:
+        cur = self._conn.execute("UPDATE chunks SET deleted = 1 WHERE doc_id = ? AND deleted = 0", (doc_id,))
+        return cur.rowcount
+
+    def delete_document(self, doc_id: str) -> int:
+        """Tombstone a document's chunks. Returns how many were removed."""
+        with self._write():
+            n = self._delete(doc_id)
+        return n
+
+    def documents(self) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT doc_id, category, COUNT(*) AS chunks FROM chunks WHERE deleted = 0 "
+                "GROUP BY doc_id, category ORDER BY doc_id"
+            ).fetchall()
+        return [{"doc_id": d, "category": c, "chunks": n} for d, c, n in rows]
+
+    def rebuild(self) -> None:
+        """Refit IDF on all live chunks, re-index them into one segment and drop tombstones."""
+        with self._write():
+            live = self._conn.execute(
+                "SELECT doc_id, category, text FROM chunks WHERE deleted = 0 ORDER BY row"
+            ).fetchall()
+            self.embedder = HashingEmbedder(n_features=self.embedder.n_features).fit(t for _, _, t in live)
+            self._save_idf()
+            self._conn.execute("DELETE FROM chunks")
+            self._conn.executemany(
+                "INSERT INTO chunks (row, doc_id, category, text) VALUES (?, ?, ?, ?)",
+                [(i, d, c, t) for i, (d, c, t) in enumerate(live)],
+            )
+            name = self._write_segment(*self._postings([(i, t) for i, (_, _, t) in enumerate(live)]))
+            self._replace_segments([name])
+
+    # --- reads ---
+
+    def search(self, query: str, k: int = 4, category: Optional[str] = None) -> list[Passage]:
+        """Top-k chunks by cosine similarity; with `category`, only chunks tagged with it or untagged."""
+        with self._lock:
+            self._sync()
+            segments, alive, codes, cats = self._segments, self._alive, self._category_codes, self._categories
+            embedder, generation = self.embedder, self._generation
+        n = len(alive)
+        q_idx, q_w = embedder.sparse(query)
+        if n == 0 or len(q_idx) == 0:
+            return []
+        q_idx = q_idx.astype(np.int32)  # match postings dtype, or searchsorted upcasts the whole segment
+
+        # Gather the postings of every query feature from every segment and
+        # accumulate dot products; scoring runs outside the lock.
+        hit_rows, hit_weights = [], []
+        for features, rows, weights in segments:
+            lo = np.searchsorted(features, q_idx, side="left")
+            hi = np.searchsorted(features, q_idx, side="right")
+            for a, b, qw in zip(lo, hi, q_w):
+                if b > a:
+                    hit_rows.append(rows[a:b])
+                    hit_weights.append(weights[a:b] * qw)
+        if not hit_rows:
+            return []
+        sims = np.bincount(np.concatenate(hit_rows), weights=np.concatenate(hit_weights), minlength=n)[:n]
+
+        mask = ~alive | (sims <= 0)
+        if category is not None:
+            code = cats.index(category) + 1 if category in cats else -1
+            mask |= (codes != 0) & (codes != code)
+        sims[mask] = -np.inf
+
+        k = min(k, n)
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = [int(i) for i in top[np.argsort(-sims[top])] if np.isfinite(sims[i])]
+        if not top:
+            return []
+
+        qs = ", ".join(["?"] * len(top))
+        with self._lock, self._snapshot():
+            stale = self._meta("generation", 0) != generation
+            rows = {} if stale else {
+                r: (d, c, t)
+                for r, d, c, t in self._conn.execute(
+                    f"SELECT row, doc_id, category, text FROM chunks WHERE row IN ({qs})", top
+                ).fetchall()
+            }
+        if stale:
+            # A write (here or in another process) landed while we were scoring
+            # and may have renumbered or deleted rows; start over
+            return self.search(query, k=k, category=category)
+        return [
+            Passage(doc_id=rows[i][0], text=rows[i][2], score=float(sims[i]), category=rows[i][1])
+            for i in top if i in rows
+        ]
+
+
+@lru_cache(maxsize=None)
+def shared_kb(path: str) -> KnowledgeBase:
+    """Process-wide instance, shared by the graph, the Admin page and the API."""
+    return KnowledgeBase(path)
+
+
+def main() -> None:
+    from config import KB_DIR
+
+    parser = argparse.ArgumentParser(description="Manage the local knowledge base.")
+    parser.add_argument("--kb", default=KB_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_add = sub.add_parser("add", help="ingest Markdown/CSV files (re-adding a file replaces it)")
+    p_add.add_argument("files", nargs="+")
+    p_add.add_argument("--category", choices=["Technical", "Billing", "General"])
+    p_del = sub.add_parser("delete", help="remove documents by doc id (the path used when adding)")
+    p_del.add_argument("doc_ids", nargs="+")
+    sub.add_parser("rebuild", help="refit IDF, re-embed everything, drop deleted chunks")
+    sub.add_parser("list")
+    p_search = sub.add_parser("search")
+    p_search.add_argument("query")
+    p_search.add_argument("-k", type=int, default=4)
+    p_search.add_argument("--category")
+    args = parser.parse_args()
+
+    kb = KnowledgeBase(args.kb)
+    if args.command == "add":
+        for f in args.files:
+            print(f"{f}: {kb.add_file(f, category=args.category)} chunks")
+    elif args.command == "delete":
+        for d in args.doc_ids:
+            print(f"{d}: {kb.delete_document(d)} chunks removed")
+    elif args.command == "rebuild":
+        kb.rebuild()
+        print(f"rebuilt: {len(kb)} chunks")
+    elif args.command == "list":
+        for d in kb.documents():
+            print(f"{d['doc_id']}\t{d['category'] or '-'}\t{d['chunks']}")
+    else:
+        for p in kb.search(args.query, k=args.k, category=args.category):
+            print(f"{p.score:.3f}  {p.doc_id}\n    {p.text[:200]}")
+
+
+if __name__ == "__main__":
+    main()
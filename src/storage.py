@@ -3,7 +3,9 @@ import os
 import sqlite3
 from dataclasses import dataclass
 from typing import Optional, Iterable, Any, Dict
-from datetime import datetime
+from datetime import datetime, timedelta
+from src import archive
+from src.worker import PeriodicWorker
 
 SCHEMA = """
 PRAGMA journal_mode=WAL;
@@ -32,14 +34,55 @@ CREATE TABLE IF NOT EXISTS feedback (
 
 CREATE INDEX IF NOT EXISTS idx_conversations_created_at ON conversations(created_at);
 CREATE INDEX IF NOT EXISTS idx_conversations_variant ON conversations(prompt_variant);
+CREATE INDEX IF NOT EXISTS idx_feedback_conversation ON feedback(conversation_id);
+
+-- Full-text index over conversations, kept in sync by triggers
+CREATE VIRTUAL TABLE IF NOT EXISTS conversations_fts USING fts5(
+  user_query, response,
+  content='conversations', content_rowid='id',
+  tokenize='porter unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS conversations_fts_ai AFTER INSERT ON conversations BEGIN
+  INSERT INTO conversations_fts(rowid, user_query, response) VALUES (new.id, new.user_query, new.response);
+END;
+CREATE TRIGGER IF NOT EXISTS conversations_fts_ad AFTER DELETE ON conversations BEGIN
+  INSERT INTO conversations_fts(conversations_fts, rowid, user_query, response) VALUES ('delete', old.id, old.user_query, old.response);
+END;
+CREATE TRIGGER IF NOT EXISTS conversations_fts_au AFTER UPDATE ON conversations BEGIN
+  INSERT INTO conversations_fts(conversations_fts, rowid, user_query, response) VALUES ('delete', old.id, old.user_query, old.response);
+  INSERT INTO conversations_fts(rowid, user_query, response) VALUES (new.id, new.user_query, new.response);
+END;
 """
 
 def _utcnow() -> str:
     return datetime.utcnow().isoformat(timespec="seconds") + "Z"
 
+def _cutoff(days: int) -> str:
+    return (datetime.utcnow() - timedelta(days=days)).isoformat(timespec="seconds") + "Z"
+
+def _fts_query(text: str) -> str:
+    """
+    Turn free text into an FTS5 query: every term quoted (so "error-504" or a
+    stray quote can't be a syntax error), all terms required, and a trailing
+    `*` kept as a prefix match.
+    """
+    out = []
+    for t in text.split():
+        prefix = t.endswith("*")
+        t = t.rstrip("*")
+        if t:
+            out.append('"' + t.replace('"', '""') + '"' + ("*" if prefix else ""))
+    return " ".join(out)
+
 @dataclass
 class DB:
     path: str
+    archive_dir: Optional[str] = None  # defaults to <db dir>/archive
+
+    def __post_init__(self) -> None:
+        if self.archive_dir is None:
+            self.archive_dir = os.path.join(os.path.dirname(self.path), "archive")
 
     def connect(self) -> sqlite3.Connection:
         os.makedirs(os.path.dirname(self.path), exist_ok=True)
@@ -49,7 +92,18 @@ class DB:
 
     def init(self) -> None:
         with self.connect() as conn:
+            had_fts = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'conversations_fts'"
+            ).fetchone() is not None
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                # Let the archiver hand freed pages back to the filesystem
+                # (incremental_vacuum). Existing DBs only switch after one VACUUM.
+                conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                conn.execute("VACUUM")
             conn.executescript(SCHEMA)
+        if not had_fts:
+            # First run on a DB that predates the FTS index: backfill it
+            self.rebuild_search_index()
 
     def insert_conversation(self, **fields: Any) -> int:
         fields.setdefault("created_at", _utcnow())
@@ -69,15 +123,18 @@ class DB:
             conn.commit()
             return int(cur.lastrowid)
 
-    def fetch_conversations(self, limit: int = 500) -> list[dict]:
+    def fetch_conversations(self, limit: int = 500, include_archive: bool = False) -> list[dict]:
         with self.connect() as conn:
             rows = conn.execute(
                 "SELECT * FROM conversations ORDER BY datetime(created_at) DESC LIMIT ?",
                 (limit,),
             ).fetchall()
-            return [dict(r) for r in rows]
+            out = [dict(r) for r in rows]
+        if include_archive:
+            out = self._extend_from_archive(out, limit, archive.read_conversations)
+        return out
 
-    def fetch_feedback_joined(self, limit: int = 500) -> list[dict]:
+    def fetch_feedback_joined(self, limit: int = 500, include_archive: bool = False) -> list[dict]:
         with self.connect() as conn:
             rows = conn.execute(
                 """
@@ -89,4 +146,200 @@ class DB:
                 """,
                 (limit,),
             ).fetchall()
-            return [dict(r) for r in rows]
+            out = [dict(r) for r in rows]
+        if include_archive:
+            out = self._extend_from_archive(out, limit, archive.read_feedback_joined)
+        return out
+
+    def rebuild_search_index(self) -> None:
+        """Re-index every hot conversation (e.g. rows written before FTS existed)."""
+        with self.connect() as conn:
+            conn.execute("INSERT INTO conversations_fts(conversations_fts) VALUES ('rebuild')")
+            conn.commit()
+
+    def search(
+        self,
+        query: str,
+        prompt_variant: str | None = None,
+        sentiment: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+        limit: int = 20,
+        offset: int = 0,
+        highlight: tuple[str, str] = ("**", "**"),
+    ) -> list[dict]:
+        """
+        BM25-ranked full-text search over user_query and response (hot rows only).
+        `since` / `until` are ISO timestamps compared against created_at.
+        Each result carries a `snippet` with matches wrapped in `highlight`.
+        """
+        match = _fts_query(query)
+        if not match:
+            return []
+        where = ["conversations_fts MATCH ?"]
+        params: list[Any] = [match]
+        if prompt_variant:
+            where.append("c.prompt_variant = ?")
+            params.append(prompt_variant)
+        if sentiment:
+            where.append("c.sentiment = ?")
+            params.append(sentiment)
+        if since:
+            where.append("c.created_at >= ?")
+            params.append(since)
+        if until:
+            where.append("c.created_at < ?")
+            params.append(until)
+        params += [limit, offset]
+        with self.connect() as conn:
+            # Rank first, then build snippets only for the page we return;
+            # snippet() over every match dominates the cost on common terms.
+            ranked = conn.execute(
+                f"""
+                SELECT conversations_fts.rowid AS id, bm25(conversations_fts) AS score
+                FROM conversations_fts
+                JOIN conversations c ON c.id = conversations_fts.rowid
+                WHERE {" AND ".join(where)}
+                ORDER BY score
+                LIMIT ? OFFSET ?
+                """,
+                params,
+            ).fetchall()
+            if not ranked:
+                return []
+            scores = {r["id"]: r["score"] for r in ranked}
+            qs = ", ".join(["?"] * len(scores))
+            rows = conn.execute(
+                f"""
+                SELECT c.*, snippet(conversations_fts, -1, ?, ?, '…', 16) AS snippet
+                FROM conversations_fts
+                JOIN conversations c ON c.id = conversations_fts.rowid
+                WHERE conversations_fts MATCH ? AND conversations_fts.rowid IN ({qs})
+                """,
+                [highlight[0], highlight[1], match, *scores],
+            ).fetchall()
+        hits = [dict(r, score=scores[r["id"]]) for r in rows]
+        return sorted(hits, key=lambda h: h["score"])
+
+    def _extend_from_archive(self, rows: list[dict], limit: int, reader) -> list[dict]:
+        # Archived rows are always older than hot rows, and partitions are
+        # listed newest first, so we can stop as soon as `limit` is reached.
+        for _, path in archive.list_partitions(self.archive_dir):
+            if len(rows) >= limit:
+                break
+            rows.extend(reader(path, limit - len(rows)))
+        return rows
+
+    def archive_older_than(self, days: int, batch_size: int = 500) -> int:
+        """
+        Move one batch of conversations older than `days` (and their feedback)
+        into monthly archive partitions, plus any feedback left behind for
+        conversations archived earlier, then give the freed pages back to the
+        filesystem. Returns the number of rows moved; call repeatedly until it
+        returns 0.
+
+        Partitions are written before the hot rows are deleted, and archive
+        inserts are idempotent, so an interrupted batch is simply redone.
+        The hot DB only holds a write lock for the final DELETE (plus
+        archiving any feedback that arrived while the batch was copied).
+        """
+        moved = self._archive_conversations(days, batch_size) + self._archive_orphaned_feedback()
+        if moved:
+            self._compact()
+        return moved
+
+    def _archive_conversations(self, days: int, batch_size: int) -> int:
+        with self.connect() as conn:
+            convs = [dict(r) for r in conn.execute(
+                "SELECT * FROM conversations WHERE created_at < ? ORDER BY id LIMIT ?",
+                (_cutoff(days), batch_size),
+            ).fetchall()]
+            if not convs:
+                return 0
+            ids = [c["id"] for c in convs]
+            qs = ", ".join(["?"] * len(ids))
+            fbs = [dict(r) for r in conn.execute(
+                f"SELECT * FROM feedback WHERE conversation_id IN ({qs})", ids
+            ).fetchall()]
+
+        month_of = {c["id"]: archive.partition_month(c["created_at"]) for c in convs}
+
+        def write(convs: list[dict], fbs: list[dict]) -> None:
+            for month in sorted({month_of[f["conversation_id"]] for f in fbs} | {month_of[c["id"]] for c in convs}):
+                archive.write_partition(
+                    archive.partition_path(self.archive_dir, month),
+                    [c for c in convs if month_of[c["id"]] == month],
+                    [f for f in fbs if month_of[f["conversation_id"]] == month],
+                )
+
+        write(convs, fbs)
+
+        conn = self.connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            seen = [f["id"] for f in fbs]
+            late = [dict(r) for r in conn.execute(
+                f"SELECT * FROM feedback WHERE conversation_id IN ({qs})"
+                + (f" AND id NOT IN ({', '.join(['?'] * len(seen))})" if seen else ""),
+                ids + seen,
+            ).fetchall()]
+            if late:
+                write([], late)
+            conn.execute(f"DELETE FROM feedback WHERE conversation_id IN ({qs})", ids)
+            conn.execute(f"DELETE FROM conversations WHERE id IN ({qs})", ids)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return len(convs)
+
+    def _archive_orphaned_feedback(self) -> int:
+        """Feedback given after its conversation was archived goes to that conversation's partition."""
+        conn = self.connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            orphans = [dict(r) for r in conn.execute(
+                "SELECT f.* FROM feedback f LEFT JOIN conversations c ON c.id = f.conversation_id "
+                "WHERE c.id IS NULL"
+            ).fetchall()]
+            months = archive.find_conversation_months(self.archive_dir, {f["conversation_id"] for f in orphans})
+            found = [f for f in orphans if f["conversation_id"] in months]  # others point at nothing; leave them
+            for month in sorted({months[f["conversation_id"]] for f in found}):
+                archive.write_partition(
+                    archive.partition_path(self.archive_dir, month),
+                    [],
+                    [f for f in found if months[f["conversation_id"]] == month],
+                )
+            if found:
+                conn.execute(
+                    f"DELETE FROM feedback WHERE id IN ({', '.join(['?'] * len(found))})",
+                    [f["id"] for f in found],
+                )
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        return len(found)
+
+    def _compact(self) -> None:
+        """Truncate pages freed by archiving off the DB file (auto_vacuum=INCREMENTAL, see init)."""
+        conn = self.connect()
+        try:
+            conn.executescript("PRAGMA incremental_vacuum;")  # execute() would free only one page per call
+            conn.execute("PRAGMA wal_checkpoint").fetchall()  # so the main file shrinks now
+        finally:
+            conn.close()
+
+    def start_archiver(self, days: int, interval_seconds: float = 3600.0, batch_size: int = 500) -> PeriodicWorker:
+        """Run `archive_older_than` in a daemon thread, in small batches."""
+        worker = PeriodicWorker(
+            "archive-worker",
+            lambda: self.archive_older_than(days, batch_size=batch_size),
+            interval_seconds=interval_seconds,
+        )
+        worker.start()
+        return worker
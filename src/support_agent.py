@@ -1,16 +1,21 @@
 from __future__ import annotations
+import re
 import time
-from typing import Dict, TypedDict, Literal, Optional
+from functools import lru_cache
+from typing import Any, Dict, List, TypedDict, Literal, Optional
 from pydantic import BaseModel, Field
-from langgraph.graph import StateGraph, END
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
+
+# langgraph / langchain are imported inside the functions that use them so
+# importing this module (e.g. for PROMPT_VARIANTS) stays cheap. The compiled
+# graph is cached per (model, knowledge base); call build_workflow() at
+# startup to pre-warm it.
 
 class State(TypedDict, total=False):
     query: str
     prompt_variant: str
     category: str
     sentiment: str
+    context: List[str]
     response: str
 
 class Classification(BaseModel):
@@ -33,9 +38,11 @@ PROMPT_VARIANTS: dict[str, dict[str, str]] = {
 }
 
 def _llm(model: str):
+    from langchain_openai import ChatOpenAI
     return ChatOpenAI(model=model, temperature=0)
 
 def classify(state: State, model: str) -> State:
+    from langchain_core.prompts import ChatPromptTemplate
     prompt = ChatPromptTemplate.from_messages([
         ("system", "Classify the customer message into category and sentiment. Output JSON only."),
         ("user", "{query}"),
@@ -45,12 +52,22 @@ def classify(state: State, model: str) -> State:
     return {"category": result.category, "sentiment": result.sentiment}
 
 def _respond(state: State, model: str, kind: str) -> State:
+    from langchain_core.prompts import ChatPromptTemplate
     v = PROMPT_VARIANTS.get(state.get("prompt_variant","A"), PROMPT_VARIANTS["A"])
+    user = v[kind] + "\n\nCustomer query: {query}"
+    context = state.get("context") or []
+    if context:
+        # Passages go in as a variable so braces in KB text aren't parsed as placeholders
+        user = (
+            "Knowledge base passages (answer from these when they cover the question; "
+            "do not invent policies or details beyond them):\n\n{context}\n\n" + user
+        )
     prompt = ChatPromptTemplate.from_messages([
         ("system", v["system"]),
-        ("user", v[kind] + "\n\nCustomer query: {query}"),
+        ("user", user),
     ])
-    response = (prompt | _llm(model)).invoke({"query": state["query"]}).content
+    inputs = {"query": state["query"], "context": "\n\n".join(f"[{i + 1}] {p}" for i, p in enumerate(context))}
+    response = (prompt | _llm(model)).invoke(inputs).content
     return {"response": response.strip()}
 
 def handle_technical(state: State, model: str) -> State:
@@ -62,6 +79,11 @@ def handle_billing(state: State, model: str) -> State:
 def handle_general(state: State, model: str) -> State:
     return _respond(state, model, "general")
 
+def retrieve(state: State, kb: Any, top_k: int) -> State:
+    """Top-k knowledge-base passages for the query, scoped to its category."""
+    passages = kb.search(state["query"], k=top_k, category=state.get("category"))
+    return {"context": [p.text for p in passages]}
+
 def escalate(state: State) -> State:
     return {"response": "I’m escalating this to a human agent due to negative sentiment. Please share your account email/order ID and best callback time."}
 
@@ -74,7 +96,16 @@ def route_query(state: State) -> str:
         return "handle_billing"
     return "handle_general"
 
-def build_workflow(model: str):
+def route_after_classify(state: State) -> str:
+    return "escalate" if state.get("sentiment") == "Negative" else "retrieve"
+
+@lru_cache(maxsize=8)
+def build_workflow(model: str, kb: Any = None, top_k: int = 4):
+    """
+    classify -> [retrieve ->] handler. The retrieve step is only added when a
+    knowledge base (src.knowledge.KnowledgeBase) is given.
+    """
+    from langgraph.graph import StateGraph, END
     workflow = StateGraph(State)
     workflow.add_node("classify", lambda s: classify(s, model))
     workflow.add_node("handle_technical", lambda s: handle_technical(s, model))
@@ -82,25 +113,68 @@ def build_workflow(model: str):
     workflow.add_node("handle_general", lambda s: handle_general(s, model))
     workflow.add_node("escalate", escalate)
 
-    workflow.add_conditional_edges(
-        "classify",
-        route_query,
-        {
-            "handle_technical": "handle_technical",
-            "handle_billing": "handle_billing",
-            "handle_general": "handle_general",
-            "escalate": "escalate",
-        },
-    )
+    handlers = {
+        "handle_technical": "handle_technical",
+        "handle_billing": "handle_billing",
+        "handle_general": "handle_general",
+        "escalate": "escalate",
+    }
+    if kb is None:
+        workflow.add_conditional_edges("classify", route_query, handlers)
+    else:
+        workflow.add_node("retrieve", lambda s: retrieve(s, kb, top_k))
+        workflow.add_conditional_edges(
+            "classify",
+            route_after_classify,
+            {"retrieve": "retrieve", "escalate": "escalate"},
+        )
+        workflow.add_conditional_edges("retrieve", route_query, handlers)
     for node in ["handle_technical","handle_billing","handle_general","escalate"]:
         workflow.add_edge(node, END)
 
     workflow.set_entry_point("classify")
     return workflow.compile()
 
-def run_support(query: str, prompt_variant: str, model: str) -> Dict[str, str]:
-    app = build_workflow(model)
+# Local sentiment check used to gate FAQ answers before any model call. It
+# only has to be cautious: anything that may be negative goes through the
+# graph, where classify() makes the real escalation decision.
+_NEGATIVE = re.compile(
+    r"\b(angry|annoy\w*|awful|bad|broke\w*|complain\w*|disappoint\w*|disgust\w*|fed up|frustrat\w*|"
+    r"furious|hate\w*|horrible|lawyer|ridiculous|rude|scam\w*|sue|terrible|unacceptable|upset|useless|"
+    r"worst|wtf|never again|not happy|still (?:not|no|waiting))\b",
+    re.IGNORECASE,
+)
+_POSITIVE = re.compile(r"\b(thanks?|thank you|great|love|awesome|perfect|appreciate\w*|excellent)\b", re.IGNORECASE)
+
+def quick_sentiment(text: str) -> str:
+    """Cheap lexicon guess at Positive / Neutral / Negative; errs towards Negative."""
+    if _NEGATIVE.search(text) or "!!" in text or "??" in text:
+        return "Negative"
+    letters = [c for c in text if c.isalpha()]
+    if len(letters) >= 12 and sum(c.isupper() for c in letters) > 0.7 * len(letters):
+        return "Negative"  # SHOUTING
+    return "Positive" if _POSITIVE.search(text) else "Neutral"
+
+def run_support(
+    query: str, prompt_variant: str, model: str, kb: Any = None, top_k: int = 4, faq: Any = None
+) -> Dict[str, str]:
+    """
+    Answer a query with the workflow. With `faq` (src.faq.FaqIndex), a query
+    that matches a precomputed answer is served from it before the graph
+    runs, unless quick_sentiment() flags it (possible escalation).
+    """
     started = time.time()
+    if faq is not None:
+        sentiment = quick_sentiment(query)
+        hit = faq.lookup(query, prompt_variant) if sentiment != "Negative" else None
+        if hit is not None:
+            return {
+                "category": hit.category,
+                "sentiment": sentiment,
+                "response": hit.response,
+                "latency_ms": int((time.time() - started) * 1000),
+            }
+    app = build_workflow(model, kb, top_k)
     result = app.invoke({"query": query, "prompt_variant": prompt_variant})
     latency_ms = int((time.time() - started) * 1000)
     return {
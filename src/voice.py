@@ -1,10 +1,13 @@
 from __future__ import annotations
 import io
 from typing import Optional
-from openai import OpenAI
+
+# openai is imported inside each helper so voice support costs nothing at
+# startup for deployments that never use it.
 
 def transcribe_wav_bytes(wav_bytes: bytes, api_key: str, model: str) -> str:
     """Speech-to-text using OpenAI Audio transcriptions."""
+    from openai import OpenAI
     client = OpenAI(api_key=api_key)
     file_obj = io.BytesIO(wav_bytes)
     file_obj.name = "audio.wav"  # some libs expect a name
@@ -16,6 +19,7 @@ def transcribe_wav_bytes(wav_bytes: bytes, api_key: str, model: str) -> str:
 
 def text_to_speech_mp3(text: str, api_key: str, model: str, voice: str = "alloy") -> bytes:
     """Text-to-speech using OpenAI Audio speech endpoint."""
+    from openai import OpenAI
     client = OpenAI(api_key=api_key)
     audio = client.audio.speech.create(
         model=model,
@@ -0,0 +1,36 @@
+# src/warmup.py
+from __future__ import annotations
+
+import time
+from typing import Any, Dict
+
+from src.storage import DB
+
+
+def warm_up(model: str, db: DB | None = None, kb: Any = None, top_k: int = 4) -> Dict[str, int]:
+    """
+    Pay the one-off startup costs before the first request does:
+    import + compile the LangGraph workflow, load langdetect profiles,
+    and create/open the SQLite DB. Pass the same `kb` / `top_k` that
+    run_support() will get, so the cached graph is the one compiled here.
+    Returns per-step timings in ms.
+    """
+    from src.support_agent import build_workflow
+    from src import i18n
+
+    timings: Dict[str, int] = {}
+
+    t = time.perf_counter()
+    build_workflow(model, kb, top_k)
+    timings["graph_ms"] = int((time.perf_counter() - t) * 1000)
+
+    t = time.perf_counter()
+    i18n.warm_up()
+    timings["langdetect_ms"] = int((time.perf_counter() - t) * 1000)
+
+    if db is not None:
+        t = time.perf_counter()
+        db.init()
+        timings["db_ms"] = int((time.perf_counter() - t) * 1000)
+
+    return timings
@@ -0,0 +1,40 @@
+# src/worker.py
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicWorker(threading.Thread):
+    """
+    Daemon thread that calls `step()` every `interval_seconds`.
+    - step returns a truthy value when there is more work queued; the worker
+      then calls it again right away instead of sleeping (e.g. archive backlog)
+    - wait_first: sleep one interval before the first step
+    A failing step is logged and retried on the next tick; it never kills the app.
+    """
+
+    def __init__(self, name: str, step: Callable[[], object], interval_seconds: float, wait_first: bool = False):
+        super().__init__(name=name, daemon=True)
+        self.step = step
+        self.interval_seconds = float(interval_seconds)
+        self.wait_first = wait_first
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        if self.wait_first and self._stop_event.wait(self.interval_seconds):
+            return
+        while not self._stop_event.is_set():
+            try:
+                more = self.step()
+            except Exception:
+                logger.exception("%s: step failed; retrying in %gs", self.name, self.interval_seconds)
+                more = False
+            if not more:
+                self._stop_event.wait(self.interval_seconds)
+
+    def stop(self) -> None:
+        self._stop_event.set()
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.cache import AppCache
+
+N = 100
+
+
+def _run_concurrently(fn, n: int = N) -> list:
+    """Call fn() from n threads released at the same time; return results/exceptions."""
+    barrier = threading.Barrier(n)
+
+    def call():
+        barrier.wait()
+        try:
+            return fn()
+        except BaseException as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=n) as pool:
+        return list(pool.map(lambda _: call(), range(n)))
+
+
+def _wait_for_flight(cache: AppCache, key: str) -> None:
+    deadline = time.time() + 5
+    while key not in cache._inflight:
+        assert time.time() < deadline, "leader never started"
+        time.sleep(0.001)
+
+
+def test_get_or_set_runs_compute_once_for_concurrent_misses():
+    cache = AppCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)  # long enough for every thread to find the flight
+        return "answer"
+
+    results = _run_concurrently(lambda: cache.get_or_set("k", compute))
+
+    assert len(calls) == 1
+    assert results == ["answer"] * N
+    assert cache.get("k") == "answer"
+
+
+def test_get_or_set_waiters_receive_leader_exception():
+    cache = AppCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        raise ValueError("upstream failed")
+
+    results = _run_concurrently(lambda: cache.get_or_set("k", compute))
+
+    assert len(calls) == 1
+    assert all(isinstance(r, ValueError) and str(r) == "upstream failed" for r in results)
+    assert cache.get("k") is None
+    assert "k" not in cache._inflight
+
+
+def test_get_or_set_waiter_times_out():
+    cache = AppCache()
+    release = threading.Event()
+    leader = threading.Thread(target=cache.get_or_set, args=("k", lambda: release.wait(5) and "late"))
+    leader.start()
+    try:
+        _wait_for_flight(cache, "k")
+        t0 = time.perf_counter()
+        with pytest.raises(TimeoutError):
+            cache.get_or_set("k", lambda: pytest.fail("waiter must not compute"), timeout=0.05)
+        assert time.perf_counter() - t0 < 1
+    finally:
+        release.set()
+        leader.join()
+    assert cache.get("k") == "late"
+
+
+def test_aget_or_set_runs_compute_once_for_concurrent_misses():
+    cache = AppCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def main():
+        return await asyncio.gather(*(cache.aget_or_set("k", compute) for _ in range(N)))
+
+    results = asyncio.run(main())
+
+    assert len(calls) == 1
+    assert results == ["answer"] * N
+    assert not cache._ainflight
+
+
+def test_chat_endpoint_coalesces_identical_requests(monkeypatch):
+    os.environ.setdefault("OPENAI_API_KEY", "sk-test")  # api.main validates config on import
+    from fastapi.testclient import TestClient
+    import api.main
+
+    calls = []
+
+    def fake_run_support(query, prompt_variant, model, kb=None, top_k=4, faq=None):
+        calls.append(query)
+        time.sleep(0.2)
+        return {"category": "Billing", "sentiment": "Neutral", "response": "Refunds take 5 days.", "latency_ms": 200}
+
+    monkeypatch.setattr(api.main, "run_support", fake_run_support)
+    monkeypatch.setattr(api.main, "cache", AppCache())
+    monkeypatch.setattr(api.main, "faq_index", None)
+    client = TestClient(api.main.app)  # no lifespan: skips warm-up / KB / FAQ loading
+
+    payload = {"query": "where is my refund", "prompt_variant": "A", "translate_in_out": False}
+    responses = _run_concurrently(lambda: client.post("/chat", json=payload))
+
+    assert len(calls) == 1
+    assert all(r.status_code == 200 for r in responses)
+    assert {r.json()["response"] for r in responses} == {"Refunds take 5 days."}
+
+
+def test_chat_endpoint_waiter_gets_504_when_leader_hangs(monkeypatch):
+    os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+    from fastapi.testclient import TestClient
+    import api.main
+
+    release = threading.Event()
+
+    def hanging_run_support(query, prompt_variant, model, kb=None, top_k=4, faq=None):
+        release.wait(5)
+        return {"category": "General", "sentiment": "Neutral", "response": "finally", "latency_ms": 5000}
+
+    cache = AppCache()
+    monkeypatch.setattr(api.main, "run_support", hanging_run_support)
+    monkeypatch.setattr(api.main, "cache", cache)
+    monkeypatch.setattr(api.main, "faq_index", None)
+    monkeypatch.setattr(api.main, "CACHE_WAIT_TIMEOUT_SECONDS", 0.1)
+    client = TestClient(api.main.app)
+
+    payload = {"query": "is the site down", "prompt_variant": "A", "translate_in_out": False}
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        leader = pool.submit(client.post, "/chat", json=payload)
+        try:
+            _wait_for_flight(cache, "A::is the site down")
+            assert client.post("/chat", json=payload).status_code == 504
+        finally:
+            release.set()
+        assert leader.result().json()["response"] == "finally"
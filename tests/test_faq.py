@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import threading
+
+import numpy as np
+import pytest
+
+from src import faq
+from src.storage import DB
+
+QUESTIONS = {
+    "Billing": ["how do i get a refund", "how do i get a refund please", "how do i get a refund today"],
+    "Technical": ["how do i reset my password", "how do i reset my password please", "how do i reset my password today"],
+}
+
+
+@pytest.fixture
+def tmp():
+    with tempfile.TemporaryDirectory() as d:
+        yield d
+
+
+@pytest.fixture
+def db(tmp):
+    d = DB(os.path.join(tmp, "app.db"))
+    d.init()
+    for category, questions in QUESTIONS.items():
+        for variant in ("A", "B"):
+            for i, q in enumerate(questions):
+                cid = d.insert_conversation(
+                    session_id="s", user_query=q, detected_language="en", prompt_variant=variant,
+                    category=category, sentiment="Neutral", response=f"{category} answer {variant}{i}", latency_ms=1,
+                )
+                d.insert_feedback(conversation_id=cid, rating=1 if i == 1 else 0)
+    # Negative and non-English conversations are never mined
+    d.insert_conversation(
+        session_id="s", user_query="how do i get a refund", detected_language="en", prompt_variant="A",
+        category="Billing", sentiment="Negative", response="escalated", latency_ms=1,
+    )
+    return d
+
+
+def test_build_and_lookup(db, tmp):
+    out = os.path.join(tmp, "faq")
+    summary = faq.build_index(db, out, cluster_threshold=0.6)
+    assert summary == {"conversations": 12, "entries": 4}
+
+    index = faq.FaqIndex(out, min_similarity=0.8)
+    hit = index.lookup("how do i get a refund", "A")
+    assert hit is not None
+    assert (hit.category, hit.prompt_variant, hit.response) == ("Billing", "A", "Billing answer A1")  # best rated
+    assert index.lookup("how do i get a refund", "B").response == "Billing answer B1"
+    assert index.lookup("my app crashes on start", "A") is None
+    assert index.lookup("how do i get a refund", "C") is None
+    assert index.stats()["variants"]["A"] == {"lookups": 2, "hits": 1, "hit_rate": 0.5}
+
+
+def test_rebuild_is_published_atomically_and_picked_up(db, tmp):
+    out = os.path.join(tmp, "faq")
+    faq.build_index(db, out, cluster_threshold=0.6)
+    first = faq.current_build(out)
+    index = faq.FaqIndex(out, min_similarity=0.8, reload_check_seconds=0)
+    assert len(index) == 4
+
+    faq.build_index(db, out, cluster_threshold=0.6, min_rating=2)  # nothing is rated that high
+    assert faq.current_build(out) != first
+    assert os.path.isdir(os.path.join(out, first))  # kept for readers mid-load, pruned later
+    assert index.lookup("how do i get a refund", "A") is None
+    assert len(index) == 0
+
+
+def test_concurrent_builds_and_reads_never_fail(db, tmp):
+    out = os.path.join(tmp, "faq")
+    faq.build_index(db, out, cluster_threshold=0.6)
+    index = faq.FaqIndex(out, min_similarity=0.8, reload_check_seconds=0)
+    errors = []
+    stop = threading.Event()
+
+    def build():
+        try:
+            for _ in range(10):
+                faq.build_index(db, out, cluster_threshold=0.6)
+        except Exception as e:
+            errors.append(e)
+
+    def read():
+        while not stop.is_set():
+            try:
+                assert index.lookup("how do i get a refund", "A") is not None
+            except Exception as e:
+                errors.append(e)
+                return
+
+    readers = [threading.Thread(target=read) for _ in range(2)]
+    builders = [threading.Thread(target=build) for _ in range(3)]
+    for t in readers + builders:
+        t.start()
+    for t in builders:
+        t.join()
+    stop.set()
+    for t in readers:
+        t.join()
+    assert errors == []
+
+
+def test_prune_removes_superseded_builds(db, tmp, monkeypatch):
+    out = os.path.join(tmp, "faq")
+    faq.build_index(db, out, cluster_threshold=0.6)
+    monkeypatch.setattr(faq, "PRUNE_AFTER_SECONDS", -1)
+    faq.build_index(db, out, cluster_threshold=0.6)
+    assert [n for n in os.listdir(out) if n.startswith(faq.BUILD_PREFIX)] == [faq.current_build(out)]
+
+
+def _publish_fake_build(out: str, meta: dict, vectors: np.ndarray, idf: np.ndarray) -> None:
+    name = f"{faq.BUILD_PREFIX}fake"
+    os.makedirs(os.path.join(out, name))
+    np.save(os.path.join(out, name, faq.VECTORS_FILE), vectors)
+    np.save(os.path.join(out, name, faq.IDF_FILE), idf)
+    with open(os.path.join(out, name, faq.META_FILE), "w", encoding="utf-8") as fh:
+        json.dump(meta, fh)
+    faq._publish(out, name)
+
+
+@pytest.mark.parametrize("meta_update, rows", [
+    ({"format": 1, "embedder": {"dim": 8, "n_features": 16, "seed": 0}}, 1),  # older format
+    ({}, 3),  # vectors don't match the entries
+])
+def test_incompatible_or_corrupt_builds_are_skipped(tmp, meta_update, rows):
+    out = os.path.join(tmp, "faq")
+    os.makedirs(out)
+    entry = {"question": "q", "response": "r", "category": "General", "prompt_variant": "A", "cluster_size": 3, "rating": 1}
+    meta = {"format": faq.FORMAT_VERSION, "built_at": 0, "embedder": {"dim": 8, "n_features": 16}, "entries": [entry]}
+    meta.update(meta_update)
+    _publish_fake_build(out, meta, np.ones((rows, 8), np.float32), np.ones(16, np.float32))
+
+    index = faq.FaqIndex(out)  # must not raise
+    assert len(index) == 0
+    assert index.lookup("q", "A") is None
+
+
+def test_legacy_layout_is_ignored(tmp):
+    out = os.path.join(tmp, "faq")
+    os.makedirs(out)
+    with open(os.path.join(out, faq.META_FILE), "w", encoding="utf-8") as fh:
+        json.dump({"embedder": {"dim": 8, "n_features": 16, "seed": 0}, "entries": []}, fh)
+    assert len(faq.FaqIndex(out)) == 0
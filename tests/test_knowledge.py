@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import tempfile
+
+import pytest
+
+from src import knowledge
+from src.knowledge import KnowledgeBase
+
+REFUNDS = "# Refunds\nRefunds are issued to the original card within 5 business days.\n"
+PASSWORDS = "# Passwords\nReset your password from the login page with the forgot password link.\n"
+SHIPPING = "# Shipping\nOrders ship within two days; tracking numbers arrive by email.\n"
+
+
+@pytest.fixture
+def tmp():
+    with tempfile.TemporaryDirectory() as d:
+        yield d
+
+
+def _docs(kb: KnowledgeBase, query: str, **kw) -> list[str]:
+    return [p.doc_id for p in kb.search(query, **kw)]
+
+
+def _npy_files(path: str) -> set[str]:
+    return {n for n in os.listdir(path) if n.endswith(".npy")}
+
+
+def test_add_search_and_category_filter(tmp):
+    kb = KnowledgeBase(tmp)
+    assert kb.add_document("refunds.md", REFUNDS, category="Billing") == 1
+    kb.add_document("passwords.md", PASSWORDS, category="Technical")
+    kb.add_document("shipping.md", SHIPPING)
+
+    assert _docs(kb, "how long do refunds take", k=1) == ["refunds.md"]
+    assert _docs(kb, "refunds card", category="Technical") == []  # Billing only
+    assert _docs(kb, "tracking email", category="Technical") == ["shipping.md"]  # untagged applies everywhere
+    assert len(KnowledgeBase(tmp)) == 3  # persisted
+
+
+def test_readding_replaces_and_delete_is_seen_by_other_instances(tmp):
+    kb, other = KnowledgeBase(tmp), KnowledgeBase(tmp)
+    kb.add_document("refunds.md", REFUNDS)
+    kb.add_document("refunds.md", "# Refunds\nWe no longer offer store credit.\n")
+    assert [d["chunks"] for d in kb.documents()] == [1]
+    assert [p.text for p in other.search("store credit")] == ["# Refunds\nWe no longer offer store credit."]
+    assert other.search("original card") == []
+
+    assert kb.delete_document("refunds.md") == 1
+    assert other.search("store credit") == []
+    assert kb.delete_document("refunds.md") == 0
+
+
+def test_rebuild_drops_tombstones_and_merges_segments(tmp):
+    kb = KnowledgeBase(tmp)
+    for name, text in [("refunds.md", REFUNDS), ("passwords.md", PASSWORDS), ("shipping.md", SHIPPING)]:
+        kb.add_document(name, text)
+    kb.delete_document("shipping.md")
+
+    kb.rebuild()
+    assert len(kb._segment_names) == 1
+    with kb._lock:
+        assert kb._conn.execute("SELECT count(*) FROM chunks").fetchone()[0] == 2
+    assert _docs(kb, "reset password", k=1) == ["passwords.md"]
+    assert _docs(KnowledgeBase(tmp), "refunds", k=1) == ["refunds.md"]
+
+
+def test_replaced_files_are_kept_for_a_grace_period(tmp, monkeypatch):
+    kb = KnowledgeBase(tmp, max_segments=1)
+    kb.add_document("refunds.md", REFUNDS)
+    first = _npy_files(tmp)
+    kb.add_document("passwords.md", PASSWORDS)  # merges: the first segment is replaced
+    assert first <= _npy_files(tmp)
+
+    monkeypatch.setattr(knowledge, "PRUNE_AFTER_SECONDS", -1)
+    kb.rebuild()
+    live = {kb._meta("idf")} | {f"{kb._segment_names[0]}.{part}.npy" for part in knowledge.SEGMENT_PARTS}
+    assert _npy_files(tmp) == live
+
+
+def test_failed_write_keeps_the_previous_state(tmp, monkeypatch):
+    kb = KnowledgeBase(tmp)
+    kb.add_document("refunds.md", REFUNDS)
+    before = _npy_files(tmp)
+
+    def boom(*args):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(kb, "_postings", boom)
+    with pytest.raises(RuntimeError):
+        kb.add_document("passwords.md", PASSWORDS)
+    assert _npy_files(tmp) == before
+    assert _docs(kb, "refunds", k=1) == ["refunds.md"]
+    assert [d["doc_id"] for d in kb.documents()] == ["refunds.md"]
+
+
+def _write_loop(path: str, rounds: int) -> None:
+    kb = KnowledgeBase(path, max_segments=1)  # every add merges, replacing every file
+    for i in range(rounds):
+        kb.add_document(f"doc-{i % 3}.md", f"# Doc {i}\nrefunds and passwords, round {i}\n")
+        if i % 5 == 4:
+            kb.rebuild()
+
+
+def _search_loop(path: str, stop, errors) -> None:
+    kb = KnowledgeBase(path)
+    while not stop.is_set():
+        try:
+            kb.search("refunds passwords")
+        except Exception as e:
+            errors.put(repr(e))
+            return
+
+
+def test_readers_in_other_processes_survive_concurrent_writes(tmp):
+    ctx = multiprocessing.get_context("spawn")
+    KnowledgeBase(tmp).add_document("seed.md", REFUNDS)
+    stop, errors = ctx.Event(), ctx.Queue()
+    readers = [ctx.Process(target=_search_loop, args=(tmp, stop, errors)) for _ in range(3)]
+    writer = ctx.Process(target=_write_loop, args=(tmp, 60))
+    for p in readers + [writer]:
+        p.start()
+    writer.join(timeout=120)
+    stop.set()
+    for p in readers:
+        p.join(timeout=30)
+
+    assert writer.exitcode == 0
+    assert errors.empty(), errors.get()
+    assert len(KnowledgeBase(tmp)) == 4  # seed + doc-0..2
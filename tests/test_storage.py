@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+from src import archive
+from src.storage import DB, _fts_query
+
+
+@pytest.fixture
+def db():
+    with tempfile.TemporaryDirectory() as tmp:
+        d = DB(os.path.join(tmp, "app.db"))
+        d.init()
+        yield d
+
+
+def _days_ago(days: int) -> str:
+    return (datetime.utcnow() - timedelta(days=days)).isoformat(timespec="seconds") + "Z"
+
+
+def _add(db: DB, days_ago: int, query: str = "where is my order", response: str = "It ships tomorrow.") -> int:
+    return db.insert_conversation(
+        session_id="s", created_at=_days_ago(days_ago), user_query=query, detected_language="en",
+        prompt_variant="A", category="General", sentiment="Neutral", response=response, latency_ms=1,
+    )
+
+
+def _hot_count(db: DB, table: str) -> int:
+    with db.connect() as conn:
+        return conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+
+
+def _archive_all(db: DB, days: int = 90, batch_size: int = 500) -> int:
+    total = 0
+    while n := db.archive_older_than(days, batch_size=batch_size):
+        total += n
+    return total
+
+
+def test_archive_moves_old_rows_in_batches(db):
+    old = [_add(db, 200 + i) for i in range(25)]
+    recent = [_add(db, 1) for _ in range(5)]
+    for cid in old[:10] + recent[:2]:
+        db.insert_feedback(conversation_id=cid, rating=1)
+
+    assert db.archive_older_than(90, batch_size=10) == 10
+    assert _hot_count(db, "conversations") == 20
+
+    _archive_all(db, batch_size=10)
+    assert _hot_count(db, "conversations") == len(recent)
+    assert _hot_count(db, "feedback") == 2
+    assert len(db.fetch_conversations(limit=100, include_archive=True)) == 30
+    assert len(db.fetch_feedback_joined(limit=100, include_archive=True)) == 12
+    archived = db.fetch_conversations(limit=100, include_archive=True)[len(recent):]
+    assert {c["response"] for c in archived} == {"It ships tomorrow."}  # decompressed
+    assert db.archive_older_than(90) == 0
+
+
+def test_archive_keeps_feedback_that_arrives_during_the_copy(db, monkeypatch):
+    cid = _add(db, 200)
+    db.insert_feedback(conversation_id=cid, rating=1, comment="early")
+    write_partition = archive.write_partition
+
+    def write_then_feedback(path, conversations, feedback):
+        write_partition(path, conversations, feedback)
+        if conversations:  # between copying the batch and deleting it
+            db.insert_feedback(conversation_id=cid, rating=-1, comment="late")
+
+    monkeypatch.setattr(archive, "write_partition", write_then_feedback)
+    db.archive_older_than(90)
+
+    assert _hot_count(db, "feedback") == 0
+    comments = {f["comment"] for f in db.fetch_feedback_joined(include_archive=True)}
+    assert comments == {"early", "late"}
+
+
+def test_archive_sweeps_feedback_given_after_the_conversation_was_archived(db):
+    cid = _add(db, 200)
+    _add(db, 1)
+    _archive_all(db)
+
+    db.insert_feedback(conversation_id=cid, rating=1, comment="orphan")
+    db.insert_feedback(conversation_id=999_999, rating=1, comment="nothing to attach to")
+    assert db.archive_older_than(90) == 1
+
+    assert [f["comment"] for f in db.fetch_feedback_joined(include_archive=True)] == ["orphan"]
+    with db.connect() as conn:
+        left = [r["comment"] for r in conn.execute("SELECT comment FROM feedback")]
+    assert left == ["nothing to attach to"]
+
+
+def test_archive_shrinks_the_hot_db(db):
+    for i in range(1200):
+        _add(db, 200, query=f"question {i} " + "x" * 200, response="y" * 400)
+    _add(db, 1)
+    size_before = os.path.getsize(db.path)
+
+    _archive_all(db)
+
+    with db.connect() as conn:
+        assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2  # incremental
+        assert conn.execute("PRAGMA freelist_count").fetchone()[0] == 0
+    assert os.path.getsize(db.path) < size_before / 4
+
+
+def test_init_migrates_existing_db_to_incremental_vacuum():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "app.db")
+        conn = sqlite3.connect(path)  # a DB created before auto_vacuum was set
+        conn.executescript(
+            "CREATE TABLE conversations (id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL, "
+            "created_at TEXT NOT NULL, user_query TEXT NOT NULL, detected_language TEXT, "
+            "prompt_variant TEXT NOT NULL, category TEXT, sentiment TEXT, response TEXT, latency_ms INTEGER);"
+            "INSERT INTO conversations (session_id, created_at, user_query, prompt_variant) "
+            "VALUES ('s', '2024-01-01T00:00:00Z', 'refund status', 'A');"
+        )
+        conn.close()
+
+        db = DB(path)
+        db.init()
+
+        with db.connect() as conn:
+            assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        assert [h["user_query"] for h in db.search("refund")] == ["refund status"]  # FTS backfilled
+
+
+def test_fts_query_quotes_terms_and_keeps_prefix_star():
+    assert _fts_query('error-504 "quoted') == '"error-504" """quoted"'
+    assert _fts_query("refu* NOT card") == '"refu"* "NOT" "card"'
+    assert _fts_query("  * ") == ""
+
+
+def test_search_index_follows_inserts_updates_and_deletes(db):
+    cid = _add(db, 1, query="my invoice is wrong", response="We corrected the invoice.")
+    _add(db, 1, query="password reset", response="Use the login page.")
+    assert [h["id"] for h in db.search("invoice")] == [cid]
+
+    with db.connect() as conn:
+        conn.execute("UPDATE conversations SET user_query = 'refund please', response = 'Refunded.' WHERE id = ?", (cid,))
+        conn.commit()
+    assert db.search("invoice") == []
+    assert [h["id"] for h in db.search("refund")] == [cid]  # porter stemming: refund ~ refunded
+
+    with db.connect() as conn:
+        conn.execute("DELETE FROM conversations WHERE id = ?", (cid,))
+        conn.commit()
+    assert db.search("refund") == []
+
+
+def test_search_filters_paging_and_snippets(db):
+    for i in range(5):
+        _add(db, 10 - 2 * i, query=f"error 504 on checkout {i}", response="Retry in a minute.")
+    _add(db, 1, query="error 504 again", response="Escalated.")
+    with db.connect() as conn:
+        conn.execute("UPDATE conversations SET sentiment = 'Negative' WHERE user_query = 'error 504 again'")
+        conn.commit()
+
+    assert len(db.search("error-504")) == 6  # hyphen does not break the query
+    assert [h["user_query"] for h in db.search("504", sentiment="Negative")] == ["error 504 again"]
+    assert len(db.search("504", since=_days_ago(7))) == 4  # 6, 4, 2 and 1 days old
+    assert len(db.search("504", until=_days_ago(7))) == 2  # 10 and 8 days old
+    pages = db.search("checkout", limit=2) + db.search("checkout", limit=2, offset=2) + db.search("checkout", limit=2, offset=4)
+    assert len({h["id"] for h in pages}) == 5
+    assert "[checkout]" in db.search("checkout", highlight=("[", "]"))[0]["snippet"]
+    assert db.search("chec*") and db.search('"') == []
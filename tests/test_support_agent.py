@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import pytest
+
+from src import support_agent
+from src.faq import FaqHit
+from src.support_agent import quick_sentiment, run_support
+
+
+class FakeFaq:
+    def __init__(self):
+        self.lookups = []
+
+    def lookup(self, query, prompt_variant):
+        self.lookups.append(query)
+        if "refund" in query.lower():
+            return FaqHit("how do refunds work", "Refunds take 5 days.", "Billing", prompt_variant, 0.97)
+        return None
+
+
+class FakeGraph:
+    def __init__(self, sentiment="Neutral"):
+        self.sentiment = sentiment
+        self.invocations = 0
+
+    def invoke(self, state):
+        self.invocations += 1
+        return {"category": "Billing", "sentiment": self.sentiment, "response": "from the graph"}
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    g = FakeGraph()
+    monkeypatch.setattr(support_agent, "build_workflow", lambda model, kb=None, top_k=4: g)
+    return g
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("How do I get a refund?", "Neutral"),
+    ("thanks! how long do refunds take", "Positive"),
+    ("This is the worst service, I want a refund", "Negative"),
+    ("still waiting for my refund", "Negative"),
+    ("WHERE IS MY REFUND ALREADY", "Negative"),
+    ("refund??", "Negative"),
+])
+def test_quick_sentiment(text, expected):
+    assert quick_sentiment(text) == expected
+
+
+def test_faq_hit_is_served_without_running_the_graph(graph):
+    faq = FakeFaq()
+    result = run_support("how do I get a refund", "A", model="m", faq=faq)
+
+    assert graph.invocations == 0
+    assert result["response"] == "Refunds take 5 days."
+    assert result["category"] == "Billing"
+    assert result["sentiment"] == "Neutral"
+    assert result["latency_ms"] < 50
+
+
+def test_possibly_negative_message_skips_the_faq(graph):
+    graph.sentiment = "Negative"
+    faq = FakeFaq()
+    result = run_support("terrible service, where is my refund", "A", model="m", faq=faq)
+
+    assert faq.lookups == []
+    assert graph.invocations == 1
+    assert result["sentiment"] == "Negative"
+
+
+def test_faq_miss_falls_through_to_the_graph(graph):
+    result = run_support("my app crashes on start", "A", model="m", faq=FakeFaq())
+    assert graph.invocations == 1
+    assert result["response"] == "from the graph"